@@ -0,0 +1,236 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from records import Access, PersonRecord, record_to_row
+
+API_ORIGIN = 'https://app.apollo.io'
+SEARCH_API_PATH = '/api/v1/mixed_people/search'
+
+# Apollo hides emails that have not been unlocked behind a placeholder address
+LOCKED_EMAIL_MARKER = 'email_not_unlocked'
+
+
+def enable_network_capture(options):
+    '''Turn on Chrome performance logging so search XHRs can be read back with capture_search_traffic().'''
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    return options
+
+
+def capture_search_traffic(driver, save_dir=None):
+    '''Drain the performance log and return the people-search XHRs seen since the last call.
+
+    Returns a list of {'request': <payload dict or None>, 'response': <JSON dict>}. With save_dir,
+    each response is also written to disk as a fixture for offline replay.
+    '''
+    requests_by_id = {}
+    response_ids = []
+    for entry in driver.get_log('performance'):
+        try:
+            message = json.loads(entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        params = message.get('params', {})
+        if message.get('method') == 'Network.requestWillBeSent':
+            request = params.get('request', {})
+            if SEARCH_API_PATH in request.get('url', ''):
+                requests_by_id[params['requestId']] = request.get('postData')
+        elif message.get('method') == 'Network.responseReceived':
+            if SEARCH_API_PATH in params.get('response', {}).get('url', ''):
+                response_ids.append(params['requestId'])
+
+    traffic = []
+    for request_id in response_ids:
+        try:
+            body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            response = json.loads(body['body'])
+        except Exception as e:
+            print(f"Could not read search response {request_id}: {e}")
+            continue
+        post_data = requests_by_id.get(request_id)
+        traffic.append({'request': json.loads(post_data) if post_data else None, 'response': response})
+
+    if save_dir and traffic:
+        os.makedirs(save_dir, exist_ok=True)
+        for item in traffic:
+            path = os.path.join(save_dir, f"search-{time.time_ns()}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(item, f)
+    return traffic
+
+
+def _value(value):
+    if value is None or value == '' or value == []:
+        return None
+    return str(value).strip() or None
+
+
+def person_to_record(person):
+    '''Map one person/contact object from a search response to a PersonRecord.'''
+    organization = person.get('organization') or person.get('account') or {}
+
+    first_name = person.get('first_name')
+    last_name = person.get('last_name')
+    if not first_name and person.get('name'):
+        parts = person['name'].split(maxsplit=1)
+        first_name = parts[0]
+        last_name = parts[1] if len(parts) > 1 else None
+
+    email = person.get('email')
+    if email and LOCKED_EMAIL_MARKER not in email:
+        personal_email = email
+    elif email or person.get('email_status') or person.get('has_email'):
+        personal_email = Access.REQUIRES_ACCESS
+    else:
+        personal_email = None
+
+    phone_numbers = person.get('phone_numbers') or []
+    if phone_numbers:
+        phone = phone_numbers[0].get('sanitized_number') or phone_numbers[0].get('raw_number')
+    else:
+        phone = None
+    if not phone:
+        phone = Access.REQUIRES_ACCESS if person.get('has_direct_phone') in (True, 'Yes') else None
+
+    location = person.get('present_raw_address') or ', '.join(
+        part for part in (person.get('city'), person.get('state'), person.get('country')) if part
+    )
+
+    niches = [organization.get('industry')] + list(organization.get('keywords') or [])
+    niches = [n for n in niches if n]
+
+    employees = organization.get('estimated_num_employees')
+
+    return PersonRecord(
+        first_name=_value(first_name),
+        last_name=_value(last_name),
+        job_title=_value(person.get('title')),
+        business_name=_value(organization.get('name') or person.get('organization_name')),
+        personal_email=personal_email,
+        phone_number=phone if isinstance(phone, Access) else _value(phone),
+        personal_linkedin=_value(person.get('linkedin_url')),
+        company_linkedin=_value(organization.get('linkedin_url')),
+        country=_value(location),
+        niche=', '.join(niches) if niches else None,
+        employee_count=f"{employees:,}" if isinstance(employees, int) else _value(employees),
+    )
+
+
+def records_from_search_response(response):
+    '''Map a whole search response (people and contacts) to PersonRecords.'''
+    people = (response.get('contacts') or []) + (response.get('people') or [])
+    return [person_to_record(person) for person in people]
+
+
+def load_fixture(path):
+    '''Read a saved search response (as written by capture_search_traffic) and return its records.'''
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    return records_from_search_response(data.get('response', data))
+
+
+class ApolloApiClient:
+    '''Replay people searches directly against the JSON API with an authenticated, pooled HTTP session.'''
+
+    def __init__(self, cookies, user_agent, origin=API_ORIGIN, pool_size=4, timeout=30):
+        self.origin = origin
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['POST'])
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        for cookie in cookies:
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        self.session.headers.update({
+            'User-Agent': user_agent,
+            'Content-Type': 'application/json',
+            'Accept': 'application/json',
+            'Origin': origin,
+            'Referer': f"{origin}/",
+        })
+        csrf_token = self.session.cookies.get('X-CSRF-TOKEN')
+        if csrf_token:
+            self.session.headers['X-CSRF-TOKEN'] = csrf_token
+
+    @classmethod
+    def from_driver(cls, driver, **kwargs):
+        '''Build a client that shares the logged-in browser's cookies and user agent.'''
+        user_agent = driver.execute_script('return navigator.userAgent')
+        return cls(driver.get_cookies(), user_agent, **kwargs)
+
+    def search(self, payload, page, per_page=100):
+        '''Fetch one page of search results.'''
+        body = dict(payload or {}, page=page, per_page=per_page)
+        response = self.session.post(f"{self.origin}{SEARCH_API_PATH}", json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def iter_pages(self, payload, start_page=1, max_pages=None, per_page=100):
+        '''Yield the records of each page until the results or max_pages run out.'''
+        page = start_page
+        while max_pages is None or page < start_page + max_pages:
+            response = self.search(payload, page, per_page)
+            records = records_from_search_response(response)
+            if not records:
+                return
+            yield records
+            total_pages = (response.get('pagination') or {}).get('total_pages')
+            if total_pages is not None and page >= total_pages:
+                return
+            page += 1
+
+    def close(self):
+        self.session.close()
+
+
+def golden_path(fixture_path):
+    return os.path.splitext(fixture_path)[0] + '.golden.jsonl'
+
+
+def check_fixture(fixture_path, write_golden=False):
+    '''Map a saved search response and compare its rows with <fixture>.golden.jsonl. Returns True if they match.'''
+    rows = [record_to_row(record) for record in load_fixture(fixture_path)]
+    golden_file = golden_path(fixture_path)
+    if write_golden:
+        with open(golden_file, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + '\n')
+        print(f"{fixture_path}: wrote {len(rows)} golden records to {golden_file}")
+        return True
+    if not os.path.isfile(golden_file):
+        print(f"{fixture_path}: {len(rows)} records, no golden")
+        return True
+    with open(golden_file, encoding='utf-8') as f:
+        golden = [json.loads(line) for line in f if line.strip()]
+    if rows == golden:
+        print(f"{fixture_path}: {len(rows)} records - matches golden")
+        return True
+    mismatched = sum(1 for a, b in zip(rows, golden) if a != b) + abs(len(rows) - len(golden))
+    print(f"{fixture_path}: MISMATCH ({mismatched} rows differ)")
+    return False
+
+
+if __name__ == "__main__":
+    # Offline check of the JSON mapping against recorded responses; exits with 1 on any mismatch
+    arg_parser = argparse.ArgumentParser(description='Check the search API mapping against saved responses.')
+    arg_parser.add_argument('fixtures', nargs='*', default=['search-sample.json'],
+                            help='responses saved by capture_search_traffic (search-*.json)')
+    arg_parser.add_argument('--write-golden', action='store_true', help='regenerate <fixture>.golden.jsonl from the current mapping')
+    arg_parser.add_argument('--print', action='store_true', help='also print the mapped rows')
+    args = arg_parser.parse_args()
+
+    failures = 0
+    for fixture_path in args.fixtures:
+        if args.print:
+            for record in load_fixture(fixture_path):
+                print(json.dumps(record_to_row(record), ensure_ascii=False))
+        failures += not check_fixture(fixture_path, args.write_golden)
+    sys.exit(1 if failures else 0)
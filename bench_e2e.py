@@ -0,0 +1,179 @@
+'''End-to-end benchmark: the real ApolloScraper, in Chrome, against the local mock Apollo (mock_apollo.py).
+
+    python bench_e2e.py --pages 20                               # one lean browser
+    python bench_e2e.py --pages 20 --browsers 3 --parse-workers 2
+    python bench_e2e.py --pages 20 --latency 0.5 --challenge-every 10 --profile full
+
+Every browser logs in and scrapes its own range of result pages. Reports pages/min, CPU and
+RSS per browser; the exit code is 1 if any browser came back with fewer pages or rows than asked for.
+'''
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from browser_profiles import BROWSER_PROFILES, browser_rss_mb
+from mock_apollo import MockApollo
+from pipeline import ScrapePipeline
+from sinks import open_sink
+
+
+def browser_cpu_seconds(driver):
+    '''CPU time (user + system) used so far by the browser and its child processes. None without psutil.'''
+    try:
+        import psutil
+    except ImportError:
+        return None
+    pid = getattr(driver, 'browser_pid', None)
+    if pid is None:
+        return None
+    try:
+        browser = psutil.Process(pid)
+        processes = [browser] + browser.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0.0
+    for process in processes:
+        try:
+            times = process.cpu_times()
+            total += times.user + times.system
+        except psutil.Error:
+            continue
+    return total
+
+
+class RssSampler:
+    '''Samples a browser's RSS every interval seconds in a background thread.'''
+
+    def __init__(self, driver, interval=1.0):
+        self.driver = driver
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = browser_rss_mb(self.driver)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_browser(scraper, num_pages, start_page, sink_path, parse_workers, result):
+    '''Scrape one browser's page range into its own sink and fill in result. Runs in a thread per browser.'''
+    cpu_before = browser_cpu_seconds(scraper.driver)
+    started = time.perf_counter()
+    try:
+        with RssSampler(scraper.driver) as sampler, open_sink(sink_path) as sink:
+            if parse_workers:
+                pages = ScrapePipeline(scraper, sink, parse_workers=parse_workers).run(num_pages, start_page)
+            else:
+                pages = scraper.scrape_data(num_pages, sink, start_page)
+            rows = sink.rows_written
+    except Exception as e:
+        print(f"Browser starting at page {start_page} failed: {e}")
+        result.update({'pages': 0, 'rows': 0, 'seconds': time.perf_counter() - started, 'error': str(e)})
+        return
+    seconds = time.perf_counter() - started
+    cpu_after = browser_cpu_seconds(scraper.driver)
+    result.update({
+        'pages': pages,
+        'rows': rows,
+        'seconds': seconds,
+        'cpu_seconds': cpu_after - cpu_before if cpu_before is not None and cpu_after is not None else None,
+        'peak_rss_mb': max(sampler.samples) if sampler.samples else None,
+        'mean_rss_mb': sum(sampler.samples) / len(sampler.samples) if sampler.samples else None,
+    })
+
+
+def _number(value, spec):
+    return format(value, spec) if value is not None else format('n/a', f">{spec.split('.')[0]}")
+
+
+def run_benchmark(num_pages, browsers=1, profile='lean', parse_workers=0, latency=0.0, jitter=0.0,
+                  challenge_every=0, challenge_seconds=3):
+    '''Run the benchmark and print one line per browser. Returns the per-browser results.'''
+    # Imported here so --help works without the browser stack installed
+    from main import PEOPLE_PAGE_SIZE, ApolloScraper
+
+    user_agents = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36"]
+    # Every browser pages through its own range, so the mock's pagination cap has to cover all of them
+    mock = MockApollo(people=browsers * num_pages * PEOPLE_PAGE_SIZE, page_size=PEOPLE_PAGE_SIZE,
+                      max_pages=browsers * num_pages, latency=latency, jitter=jitter,
+                      challenge_every=challenge_every, challenge_seconds=challenge_seconds).start()
+    workdir = tempfile.mkdtemp(prefix='bench_e2e_')
+    print(f"Mock Apollo at {mock.url}, output in {workdir}")
+    scrapers = []
+    results = [{} for _ in range(browsers)]
+    try:
+        # Launched one after another: undetected-chromedriver patches its driver binary on start
+        for index in range(browsers):
+            scraper = ApolloScraper(user_agents, f"{mock.url}#/people", app_url=mock.url, politeness_delay=None,
+                                    browser_profile=profile, user_data_dir=os.path.join(workdir, f"profile-{index}"))
+            scrapers.append(scraper)
+            if not scraper.login():
+                raise RuntimeError(f"Browser {index} could not log in to the mock")
+
+        python_cpu_before = time.process_time()
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(target=run_browser, args=(scraper, num_pages, index * num_pages + 1,
+                                                       os.path.join(workdir, f"data-{index}.jsonl"), parse_workers,
+                                                       results[index]))
+            for index, scraper in enumerate(scrapers)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        python_cpu = time.process_time() - python_cpu_before
+    finally:
+        for scraper in scrapers:
+            scraper.quit()
+        mock.stop()
+
+    print(f"\n{'browser':>7} {'pages':>6} {'rows':>6} {'seconds':>8} {'pages/min':>9} {'CPU %':>6} {'peak MB':>8} {'mean MB':>8}")
+    for index, result in enumerate(results):
+        seconds = result.get('seconds') or 0
+        cpu_percent = result['cpu_seconds'] / seconds * 100 if result.get('cpu_seconds') is not None and seconds else None
+        print(f"{index:>7} {result.get('pages', 0):>6} {result.get('rows', 0):>6} {seconds:>8.1f} "
+              f"{result.get('pages', 0) / seconds * 60 if seconds else 0:>9.1f} {_number(cpu_percent, '6.0f')} "
+              f"{_number(result.get('peak_rss_mb'), '8.0f')} {_number(result.get('mean_rss_mb'), '8.0f')}")
+    total_pages = sum(result.get('pages', 0) for result in results)
+    print(f"{'all':>7} {total_pages:>6} {sum(r.get('rows', 0) for r in results):>6} {elapsed:>8.1f} "
+          f"{total_pages / elapsed * 60 if elapsed else 0:>9.1f}   (scraper process CPU {python_cpu / elapsed * 100:.0f}%)")
+    if mock.challenges:
+        print(f"The mock showed {mock.challenges} challenges over {mock.requests} search requests")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=20, help='result pages per browser')
+    arg_parser.add_argument('--browsers', type=int, default=1)
+    arg_parser.add_argument('--profile', default='lean', choices=list(BROWSER_PROFILES))
+    arg_parser.add_argument('--parse-workers', type=int, default=0, help='parse in a ScrapePipeline with this many processes')
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every search request')
+    arg_parser.add_argument('--jitter', type=float, default=0.0, help='up to this many more seconds, at random')
+    arg_parser.add_argument('--challenge-every', type=int, default=0, help='show a challenge on every Nth search request')
+    arg_parser.add_argument('--challenge-seconds', type=float, default=3)
+    args = arg_parser.parse_args()
+
+    results = run_benchmark(args.pages, args.browsers, args.profile, args.parse_workers, args.latency, args.jitter,
+                            args.challenge_every, args.challenge_seconds)
+    from main import PEOPLE_PAGE_SIZE
+    expected_rows = args.pages * PEOPLE_PAGE_SIZE
+    short = [r for r in results if r.get('pages', 0) < args.pages or r.get('rows', 0) < expected_rows]
+    sys.exit(1 if short else 0)
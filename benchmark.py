@@ -0,0 +1,162 @@
+'''Offline benchmark for the row parsers, driven by saved page snapshots.
+
+    python benchmark.py                                  # benchmark page_source_debug.html
+    python benchmark.py snapshots/*.html --repeat 50     # several snapshots
+    python benchmark.py --write-golden                   # refresh golden records from the bs4 reference
+
+Each snapshot is checked against <snapshot>.golden.jsonl; the exit code is 1 on any mismatch,
+so the same command works as a CI gate for parser changes.
+'''
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from main import PEOPLE_ROW_SELECTOR, PEOPLE_TABLE_BODY_SELECTOR
+from parsers import PARSERS, get_parser
+from records import record_to_row
+
+DEFAULT_SNAPSHOTS = ['page_source_debug.html']
+
+
+def golden_path(snapshot_path):
+    return os.path.splitext(snapshot_path)[0] + '.golden.jsonl'
+
+
+def read_golden(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_golden(path, records):
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def peak_rss_mb():
+    '''Peak resident set size of this process so far, in MB (None where unsupported).'''
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def extract_rowgroup(html):
+    '''The table-body fragment that extraction_mode='rowgroup' would transfer for this snapshot.'''
+    import lxml.html
+    parser = get_parser('lxml', PEOPLE_TABLE_BODY_SELECTOR, PEOPLE_ROW_SELECTOR)
+    body = parser._first(parser._document(html), PEOPLE_TABLE_BODY_SELECTOR)
+    return lxml.html.tostring(body, encoding='unicode') if body is not None else ''
+
+
+def time_fields(parser, html):
+    '''Parse once with every selector query timed, and return seconds spent per field.'''
+    field_names = {selector: name for name, selector in parser.field_selectors.items()}
+    field_names[parser.table_body_selector] = 'table_body'
+    field_names[parser.row_selector] = 'rows'
+    totals = defaultdict(float)
+
+    def timed(method):
+        def wrapper(node, selector):
+            started = time.perf_counter()
+            try:
+                return method(node, selector)
+            finally:
+                totals[field_names.get(selector, selector)] += time.perf_counter() - started
+        return wrapper
+
+    original_document = parser._document
+
+    def timed_document(markup):
+        started = time.perf_counter()
+        try:
+            return original_document(markup)
+        finally:
+            totals['document'] += time.perf_counter() - started
+
+    parser._first = timed(parser._first)
+    parser._all = timed(parser._all)
+    parser._document = timed_document
+    try:
+        parser.parse(html)
+    finally:
+        del parser._first, parser._all, parser._document
+    return dict(totals)
+
+
+def bench(parser, html, repeat):
+    '''Parse html repeat times and return throughput numbers and the records of the last run.'''
+    records = parser.parse(html) or []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        parser.parse(html)
+    elapsed = time.perf_counter() - started
+    return {
+        'pages_per_sec': repeat / elapsed,
+        'rows_per_sec': repeat * len(records) / elapsed,
+        'ms_per_page': elapsed / repeat * 1000,
+        'rows': len(records),
+    }, records
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('snapshots', nargs='*', default=DEFAULT_SNAPSHOTS, help='saved page HTML files')
+    arg_parser.add_argument('--parsers', nargs='+', default=list(PARSERS), choices=list(PARSERS))
+    arg_parser.add_argument('--repeat', type=int, default=20, help='parses per snapshot and parser')
+    arg_parser.add_argument('--input', choices=['page_source', 'rowgroup'], default='page_source',
+                            help="parse the whole page, or only the table body as extraction_mode='rowgroup' would")
+    arg_parser.add_argument('--write-golden', action='store_true', help='regenerate golden records with the bs4 reference parser')
+    args = arg_parser.parse_args(argv)
+
+    failures = 0
+    for snapshot in args.snapshots:
+        with open(snapshot, encoding='utf-8') as f:
+            html = f.read()
+        if args.input == 'rowgroup':
+            html = extract_rowgroup(html)
+        print(f"\n{snapshot} ({len(html) / 1024:.0f} KB, input={args.input})")
+
+        golden_file = golden_path(snapshot)
+        if args.write_golden:
+            reference = get_parser('bs4', PEOPLE_TABLE_BODY_SELECTOR, PEOPLE_ROW_SELECTOR).parse(html) or []
+            write_golden(golden_file, [record_to_row(record) for record in reference])
+            print(f"  wrote {len(reference)} golden records to {golden_file}")
+        golden = read_golden(golden_file) if os.path.isfile(golden_file) else None
+
+        for name in args.parsers:
+            parser = get_parser(name, PEOPLE_TABLE_BODY_SELECTOR, PEOPLE_ROW_SELECTOR)
+            stats, records = bench(parser, html, args.repeat)
+            records = [record_to_row(record) for record in records]
+            field_times = time_fields(parser, html)
+            rss = peak_rss_mb()
+
+            if golden is None:
+                verdict = 'no golden'
+            elif records == golden:
+                verdict = 'matches golden'
+            else:
+                failures += 1
+                mismatched = sum(1 for a, b in zip(records, golden) if a != b) + abs(len(records) - len(golden))
+                verdict = f"MISMATCH ({mismatched} rows differ)"
+
+            print(f"  [{name}] {stats['pages_per_sec']:.1f} pages/s, {stats['rows_per_sec']:.0f} rows/s, "
+                  f"{stats['ms_per_page']:.1f} ms/page, {stats['rows']} rows, "
+                  f"peak RSS {f'{rss:.0f} MB' if rss is not None else 'n/a'} - {verdict}")
+            for field, seconds in sorted(field_times.items(), key=lambda item: -item[1]):
+                print(f"      {field:<16} {seconds * 1000:8.2f} ms")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from browser_profiles import browser_rss_mb
+
+
+class BrowserPool:
+    '''Logged-in ApolloScraper browsers that are kept healthy over long jobs.
+
+    factory() builds a scraper; the pool logs it in and hands it out with acquire()/lease(). While a
+    scraper crawls, it reports each page to the pool, which recycles the browser after max_pages pages
+    or once it uses more than max_rss_mb, and restarts it if it has died. A recycled scraper logs back
+    in (from the session cache when it has one) and returns to the result page it was on.
+
+    Health is checked between pages, from the thread that drives the browser, because a WebDriver
+    session must not be used by two threads at once.
+    '''
+
+    def __init__(self, factory, size=1, max_pages=300, max_rss_mb=1500, response_timeout=10, check_every=5):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.response_timeout = response_timeout
+        self.check_every = check_every
+        self._idle = queue.Queue()
+        self._scrapers = []
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._rss_warned = False
+
+    def _launch(self):
+        scraper = self.factory()
+        scraper.browser_pool = self
+        self._pages[id(scraper)] = 0
+        if not scraper.login():
+            scraper.quit()
+            raise RuntimeError("New browser could not log in")
+        return scraper
+
+    def acquire(self, timeout=None):
+        '''Take a browser out of the pool, launching one if the pool is not full yet.'''
+        with self._lock:
+            launch = self._idle.empty() and len(self._scrapers) < self.size
+            if launch:
+                # Reserve the slot before the slow launch so concurrent callers do not overshoot size
+                self._scrapers.append(None)
+        if launch:
+            try:
+                scraper = self._launch()
+            except Exception:
+                with self._lock:
+                    self._scrapers.remove(None)
+                raise
+            with self._lock:
+                self._scrapers[self._scrapers.index(None)] = scraper
+            return scraper
+        return self._idle.get(timeout=timeout)
+
+    def release(self, scraper):
+        '''Hand a browser back, restarting it first if it died while it was out.'''
+        if not self.is_alive(scraper):
+            self.restart(scraper, reason='crashed')
+        self._idle.put(scraper)
+
+    @contextmanager
+    def lease(self, timeout=None):
+        scraper = self.acquire(timeout)
+        try:
+            yield scraper
+        finally:
+            self.release(scraper)
+
+    def is_alive(self, scraper):
+        '''True if the browser answers a trivial script within response_timeout seconds.'''
+        result = {}
+
+        def ping():
+            try:
+                result['ok'] = scraper.driver.execute_script('return 1') == 1
+            except Exception:
+                result['ok'] = False
+
+        # A hung renderer can block a WebDriver call for minutes, so ping from a throwaway thread
+        pinger = threading.Thread(target=ping, daemon=True)
+        pinger.start()
+        pinger.join(self.response_timeout)
+        return result.get('ok', False)
+
+    def rss_mb(self, scraper):
+        return browser_rss_mb(scraper.driver)
+
+    def page_done(self, scraper):
+        '''Count a page scraped with this browser.'''
+        self._pages[id(scraper)] = self._pages.get(id(scraper), 0) + 1
+
+    def needs_recycle(self, scraper):
+        '''Return why the browser should be replaced before the next page ('max_pages', 'unresponsive'
+        or 'max_rss'), or None if it is fine.'''
+        pages = self._pages.get(id(scraper), 0)
+        if self.max_pages and pages >= self.max_pages:
+            print(f"Browser has scraped {pages} pages")
+            return 'max_pages'
+        if pages % self.check_every:
+            return None
+        if not self.is_alive(scraper):
+            print(f"Browser did not respond within {self.response_timeout}s")
+            return 'unresponsive'
+        rss = self.rss_mb(scraper)
+        if rss is None and self.max_rss_mb and not self._rss_warned:
+            self._rss_warned = True
+            print(f"Cannot read browser memory (is psutil installed?); max_rss_mb={self.max_rss_mb} will not be enforced")
+        if rss is not None and self.max_rss_mb and rss > self.max_rss_mb:
+            print(f"Browser is using {rss:.0f} MB (limit {self.max_rss_mb} MB)")
+            return 'max_rss'
+        return None
+
+    def restart(self, scraper, resume_page=None, reason='recycle'):
+        '''Replace the scraper's browser with a fresh one at resume_page. Returns False if it could not get back there.'''
+        print(f"Restarting browser ({reason})...")
+        scraper.metrics.incr('browser_restarts', reason=reason)
+        self._pages[id(scraper)] = 0
+        return scraper.restart_browser(resume_page)
+
+    def close(self):
+        '''Quit every browser in the pool.'''
+        for scraper in self._scrapers:
+            if scraper is not None:
+                scraper.quit()
+        self._scrapers = []
+        self._pages = {}
+        self._idle = queue.Queue()
@@ -0,0 +1,166 @@
+'''Browser launch profiles for ApolloScraper, and a way to measure what they cost per page.
+
+    python browser_profiles.py --pages 5        # log in with each profile and compare the footprints
+'''
+import argparse
+import statistics
+
+# URL patterns (Chrome's Network.setBlockedURLs wildcard syntax) that the lean profile never loads.
+# Cloudflare's challenge scripts are deliberately not on the list.
+LEAN_BLOCKED_URLS = [
+    # Images, avatars and company logos
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.avif', '*.svg', '*.ico',
+    # Media
+    '*.mp4', '*.webm', '*.mp3', '*.wav',
+    # Fonts
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*fonts.googleapis.com*', '*fonts.gstatic.com*',
+    # Third-party analytics, chat widgets and session recorders
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*facebook.net*',
+    '*segment.io*', '*segment.com*', '*intercom.io*', '*intercomcdn.com*', '*hotjar.com*',
+    '*fullstory.com*', '*sentry.io*', '*datadoghq-browser-agent.com*', '*hs-scripts.com*', '*clarity.ms*',
+]
+
+# 'full' - headed, maximized and loading everything (best when watching a run or solving a challenge by hand)
+# 'lean' - headless, small window, no GPU or extensions, with images, media, fonts and trackers blocked
+BROWSER_PROFILES = {
+    'full': {
+        'headless': False,
+        'window_size': None,
+        'arguments': [],
+        'blocked_urls': [],
+    },
+    'lean': {
+        'headless': True,
+        'window_size': (1366, 900),
+        'arguments': [
+            '--disable-gpu',
+            '--disable-extensions',
+            '--mute-audio',
+            '--blink-settings=imagesEnabled=false',
+        ],
+        'blocked_urls': LEAN_BLOCKED_URLS,
+    },
+}
+
+PAGE_TIMING_JS = '''
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    load_ms: nav ? nav.loadEventEnd - nav.startTime : null,
+    resources: resources.length,
+    transfer_kb: resources.reduce((total, r) => total + (r.transferSize || 0), 0) / 1024,
+    js_heap_mb: performance.memory ? performance.memory.usedJSHeapSize / 1048576 : null,
+};
+'''
+
+
+def get_browser_profile(name):
+    if name not in BROWSER_PROFILES:
+        raise ValueError(f"Unknown browser profile '{name}'. Choose one of: {', '.join(BROWSER_PROFILES)}")
+    return BROWSER_PROFILES[name]
+
+
+def apply_profile_options(options, profile):
+    '''Add a profile's command-line switches to ChromeOptions. Headless mode is passed to uc.Chrome separately.'''
+    for argument in profile['arguments']:
+        options.add_argument(argument)
+    if profile['window_size']:
+        options.add_argument(f"--window-size={profile['window_size'][0]},{profile['window_size'][1]}")
+    return options
+
+
+def apply_profile_driver(driver, profile):
+    '''Finish setting up a launched browser: maximize it or install the URL block list.'''
+    if profile['window_size'] is None and not profile['headless']:
+        driver.maximize_window()
+    if profile['blocked_urls']:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': profile['blocked_urls']})
+
+
+def browser_rss_mb(driver):
+    '''Resident memory of the browser and all its child processes (renderers, GPU, network), in MB.
+
+    Needs psutil; returns None without it or when the browser's process id is unknown.
+    '''
+    try:
+        import psutil
+    except ImportError:
+        return None
+    pid = getattr(driver, 'browser_pid', None)
+    if pid is None:
+        return None
+    try:
+        browser = psutil.Process(pid)
+        processes = [browser] + browser.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
+
+
+def page_footprint(driver):
+    '''Load timings, bytes transferred and memory of the page the browser is on.
+
+    Resource counts and transfer sizes are cumulative since the document was loaded, because
+    Apollo paginates without reloading it; compare them between pages to get per-page numbers.
+    '''
+    footprint = driver.execute_script(PAGE_TIMING_JS) or {}
+    footprint['browser_rss_mb'] = browser_rss_mb(driver)
+    return footprint
+
+
+def _summarize(values):
+    values = [v for v in values if v is not None]
+    return f"{statistics.mean(values):8.1f}" if values else '     n/a'
+
+
+def compare_profiles(profile_names, num_pages):
+    '''Log in with each profile, page through the configured search and print the mean footprint per page.'''
+    from main import BASE_URL, FILTERS, ApolloScraper
+
+    user_agents = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36"]
+    results = {}
+    for name in profile_names:
+        print(f"\nMeasuring the '{name}' browser profile over {num_pages} pages...")
+        scraper = ApolloScraper(user_agents, BASE_URL, FILTERS, browser_profile=name, politeness_delay=None)
+        samples = []
+        try:
+            scraper.login()
+            for page in range(1, num_pages + 1):
+                footprint = page_footprint(scraper.driver)
+                # The first page is a full document load; later pages are Next clicks
+                navigate_spans = [s for s in scraper.metrics.spans if s['stage'] == 'navigate']
+                if navigate_spans:
+                    footprint['page_seconds'] = navigate_spans[-1]['seconds']
+                elif footprint.get('load_ms') is not None:
+                    footprint['page_seconds'] = footprint['load_ms'] / 1000
+                samples.append(footprint)
+                if page < num_pages and scraper._go_to_next_page(page) != 'next':
+                    break
+        finally:
+            scraper.quit()
+        results[name] = samples
+
+    print(f"\n{'profile':<8} {'pages':>5} {'RSS MB':>8} {'heap MB':>8} {'page s':>8} {'KB/page':>8}")
+    for name, samples in results.items():
+        transfer = [s.get('transfer_kb') for s in samples]
+        per_page_kb = [b - a for a, b in zip(transfer, transfer[1:]) if a is not None and b is not None] or transfer
+        print(f"{name:<8} {len(samples):>5} {_summarize(s.get('browser_rss_mb') for s in samples)} "
+              f"{_summarize(s.get('js_heap_mb') for s in samples)} "
+              f"{_summarize(s.get('page_seconds') for s in samples)} {_summarize(per_page_kb)}")
+    return results
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--profiles', nargs='+', default=list(BROWSER_PROFILES), choices=list(BROWSER_PROFILES))
+    arg_parser.add_argument('--pages', type=int, default=5)
+    args = arg_parser.parse_args()
+    compare_profiles(args.profiles, args.pages)
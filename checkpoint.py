@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import time
+
+
+def crawl_key(base_url, filters, start_page=1, job_id=None):
+    '''Stable identifier for a crawl: the same URL, filter set and start page always map to the same key.
+
+    A job_id (see daemon.py) keeps jobs that run the same search into different sinks from resuming each other.
+    '''
+    crawl = {'base_url': base_url, 'filters': filters, 'start_page': start_page}
+    if job_id is not None:
+        crawl['job_id'] = job_id
+    payload = json.dumps(crawl, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class CheckpointJournal:
+    '''Append-only JSON Lines journal of crawl progress, one entry per completed page.
+
+    Entries are only ever appended, so a crash can at worst lose the page that was in flight,
+    which the dedup index makes safe to scrape again.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+    def _entries(self):
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write is ignored
+                    continue
+
+    def _append(self, entry):
+        entry['ts'] = time.time()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def load(self, key):
+        '''Return the latest state recorded for key, or None if the crawl has never run.'''
+        state = None
+        for entry in self._entries():
+            if entry.get('key') == key:
+                state = entry
+        return state
+
+    def resume_point(self, key):
+        '''Return the state of an unfinished crawl to resume from, or None to start fresh.'''
+        state = self.load(key)
+        if state and state.get('status') == 'running':
+            return state
+        return None
+
+    def record_page(self, key, filters, page, pages_done, rows, total_rows, cursor):
+        '''Record that result page `page` was scraped and persisted.'''
+        self._append({
+            'key': key,
+            'status': 'running',
+            'filters': filters,
+            'page': page,
+            'pages_done': pages_done,
+            'rows': rows,
+            'total_rows': total_rows,
+            'cursor': cursor,
+        })
+
+    def mark_complete(self, key, pages_done, total_rows):
+        '''Record that the crawl finished, so the next run starts from page 1 again.'''
+        self._append({'key': key, 'status': 'complete', 'pages_done': pages_done, 'total_rows': total_rows})
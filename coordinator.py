@@ -0,0 +1,172 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from browser_pool import BrowserPool
+from checkpoint import CheckpointJournal
+from dedup import DedupIndex
+from sinks import SINKS_BY_EXTENSION, SqliteSink, open_sink
+
+
+def shard_pages(total_pages, num_shards, filters=None):
+    '''Split pages 1..total_pages into contiguous, disjoint ranges, one per shard.'''
+    num_shards = max(1, min(num_shards, total_pages))
+    base, extra = divmod(total_pages, num_shards)
+    shards = []
+    start_page = 1
+    for shard_id in range(num_shards):
+        num_pages = base + (1 if shard_id < extra else 0)
+        shards.append({'shard_id': shard_id, 'filters': dict(filters or {}), 'start_page': start_page, 'num_pages': num_pages})
+        start_page += num_pages
+    return shards
+
+
+def shard_filters(filters, dimension, num_shards, pages_per_shard):
+    '''Split a list-valued filter (e.g. 'seniorities') round-robin into disjoint filter sets.'''
+    values = filters.get(dimension)
+    if isinstance(values, str):
+        values = [values]
+    if not values:
+        raise ValueError(f"Filter '{dimension}' has no values to shard on")
+
+    num_shards = max(1, min(num_shards, len(values)))
+    shards = []
+    for shard_id in range(num_shards):
+        shard_values = values[shard_id::num_shards]
+        shard = dict(filters)
+        shard[dimension] = shard_values if isinstance(filters[dimension], list) else shard_values[0]
+        shards.append({'shard_id': shard_id, 'filters': shard, 'start_page': 1, 'num_pages': pages_per_shard})
+    return shards
+
+
+def worker_sink_path(sink_path, shard_id):
+    '''SQLite sinks are shared by all workers; file sinks get one part per shard to avoid interleaved writes.'''
+    root, ext = os.path.splitext(sink_path)
+    if SINKS_BY_EXTENSION.get(ext.lower()) is SqliteSink:
+        return sink_path
+    return f"{root}.shard-{shard_id}{ext}"
+
+
+def run_shard(shard, user_agent, base_url, sink_path, dedup_path, profile_dir, launch_delay=0, checkpoint_path=None,
+              browser_profile='lean', filter_plans_path=None, rate_governor_path=None):
+    '''Scrape one shard in its own browser. Runs inside a worker process.'''
+    # Imported here so the parent process never pays for the browser stack
+    from filter_plan import FilterPlanCache
+    from main import BROWSER_MAX_PAGES, BROWSER_MAX_RSS_MB, EMAIL, ApolloScraper
+    from rate_governor import RateGovernor
+
+    # undetected-chromedriver patches its driver binary on start; staggering launches avoids races
+    time.sleep(launch_delay)
+    started = time.perf_counter()
+    sink = open_sink(sink_path)
+    dedup_index = DedupIndex(dedup_path)
+    checkpoint = CheckpointJournal(checkpoint_path) if checkpoint_path else None
+    filter_plans = FilterPlanCache(filter_plans_path) if filter_plans_path else None
+    # All shards log in as the same account, so they draw page loads from the same bucket
+    rate_governor = RateGovernor(rate_governor_path, EMAIL) if rate_governor_path else None
+    browser_pool = BrowserPool(
+        lambda: ApolloScraper([user_agent], base_url, shard['filters'], dedup_index=dedup_index,
+                              user_data_dir=profile_dir, checkpoint=checkpoint, browser_profile=browser_profile,
+                              filter_plans=filter_plans, rate_governor=rate_governor),
+        max_pages=BROWSER_MAX_PAGES, max_rss_mb=BROWSER_MAX_RSS_MB,
+    )
+    try:
+        scraper = browser_pool.acquire()
+        pages = scraper.scrape_data(shard['num_pages'], sink, start_page=shard['start_page'])
+    finally:
+        browser_pool.close()
+        sink.close()
+        dedup_index.close()
+        if rate_governor is not None:
+            rate_governor.close()
+
+    return {
+        'shard_id': shard['shard_id'],
+        'pages': pages or 0,
+        'rows_written': sink.rows_written,
+        'duplicates_skipped': dedup_index.skipped,
+        'seconds': time.perf_counter() - started,
+    }
+
+
+class CrawlCoordinator:
+    '''Run several ApolloScraper browsers in a process pool, one shard each, into a shared deduplicating sink.
+
+    Browsers use the 'lean' profile by default, since memory per browser limits how many fit on one machine.
+    '''
+
+    def __init__(self, user_agents, base_url, sink_path, dedup_path, max_workers=4, profile_root='chrome_profiles', launch_stagger=5,
+                 checkpoint_path=None, browser_profile='lean', filter_plans_path=None, rate_governor_path=None):
+        self.user_agents = user_agents
+        self.base_url = base_url
+        self.sink_path = sink_path
+        self.dedup_path = dedup_path
+        self.max_workers = max_workers
+        self.profile_root = profile_root
+        self.launch_stagger = launch_stagger
+        self.checkpoint_path = checkpoint_path
+        self.browser_profile = browser_profile
+        # Filter URLs recorded by query_planner.py, so shards skip checking them against the UI
+        self.filter_plans_path = filter_plans_path
+        self.rate_governor_path = rate_governor_path
+
+    def run(self, shards):
+        '''Scrape every shard, at most max_workers at a time. Returns the per-shard results.'''
+        workers = max(1, min(self.max_workers, len(shards)))
+        print(f"Scraping {len(shards)} shards with {workers} browser workers...")
+        started = time.perf_counter()
+        results = []
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for shard in shards:
+                shard_id = shard['shard_id']
+                future = pool.submit(
+                    run_shard,
+                    shard,
+                    self.user_agents[shard_id % len(self.user_agents)],
+                    self.base_url,
+                    worker_sink_path(self.sink_path, shard_id),
+                    self.dedup_path,
+                    os.path.abspath(os.path.join(self.profile_root, f"shard-{shard_id}")),
+                    # Only the first wave of browsers needs staggering
+                    self.launch_stagger * shard_id if shard_id < workers else 0,
+                    self.checkpoint_path,
+                    self.browser_profile,
+                    self.filter_plans_path,
+                    self.rate_governor_path,
+                )
+                futures[future] = shard
+
+            for future in as_completed(futures):
+                shard = futures[future]
+                try:
+                    result = future.result()
+                    results.append(result)
+                    print(f"Shard {result['shard_id']} done: {result['pages']} pages, {result['rows_written']} rows "
+                          f"in {result['seconds']:.0f}s")
+                except Exception as e:
+                    print(f"Shard {shard['shard_id']} failed: {e}")
+                    results.append({'shard_id': shard['shard_id'], 'error': str(e)})
+
+        elapsed = time.perf_counter() - started
+        pages = sum(r.get('pages', 0) for r in results)
+        print(f"All shards finished: {pages} pages in {elapsed:.0f}s ({pages / elapsed * 60 if elapsed else 0:.1f} pages/min)")
+        return results
+
+
+if __name__ == "__main__":
+    from main import BASE_URL, FILTERS
+
+    user_agents = [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.81 Safari/537.36",
+    ]
+
+    coordinator = CrawlCoordinator(user_agents, BASE_URL, sink_path='data.db', dedup_path='seen_people.db', max_workers=4,
+                                   checkpoint_path='crawl_checkpoint.jsonl', rate_governor_path='rate_governor.db')
+    shards = shard_pages(total_pages=20, num_shards=4, filters=FILTERS)
+    coordinator.run(shards)
+
+    with open_sink('data.db') as sink:
+        sink.export_excel('data.xlsx')
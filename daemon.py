@@ -0,0 +1,283 @@
+'''Resident scrape service: warm, logged-in browsers working through a SQLite job queue.
+
+    python daemon.py serve --workers 2                                    # keep running, take jobs
+    python daemon.py submit --filters '{"seniorities": ["owner"]}' --pages 10 --sink owners.csv --priority 5
+    python daemon.py submit --base-url 'https://app.apollo.io/#/lists/<id>' --sink list.jsonl
+    python daemon.py status                                               # all jobs, or: status <job id>
+    python daemon.py cancel <job id>
+
+submit, status and cancel only touch the queue file, so they return at once, whether or not the
+daemon is running. Jobs without --pages scrape as many pages as the search has (up to Apollo's cap).
+'''
+import argparse
+import json
+import sqlite3
+import threading
+import time
+
+JOB_STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+
+class JobQueue:
+    '''Scrape jobs in a SQLite table, shared by the daemon and the command line.'''
+
+    def __init__(self, path):
+        self.path = path
+        # Autocommit mode; claim() takes the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, priority INTEGER, base_url TEXT, filters TEXT, num_pages INTEGER, '
+            'sink_path TEXT, status TEXT, worker TEXT, pages_done INTEGER DEFAULT 0, rows_written INTEGER DEFAULT 0, '
+            'error TEXT, submitted_at REAL, started_at REAL, finished_at REAL)'
+        )
+        self._lock = threading.Lock()
+
+    def _job(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['filters'] = json.loads(job['filters'])
+        return job
+
+    def submit(self, base_url, filters, sink_path, num_pages=None, priority=0):
+        '''Queue a job. Higher priorities run first; equal priorities in submission order. Returns the job id.'''
+        with self._lock:
+            cursor = self._conn.execute(
+                'INSERT INTO jobs (priority, base_url, filters, num_pages, sink_path, status, submitted_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (priority, base_url, json.dumps(filters or {}), num_pages, sink_path, 'queued', time.time()),
+            )
+        return cursor.lastrowid
+
+    def claim(self, worker):
+        '''Mark the next queued job as running for worker and return it, or None if the queue is empty.'''
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started_at = ? WHERE id = ?",
+                        (worker, time.time(), row['id']),
+                    )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return self._job(row)
+
+    def progress(self, job_id, pages_done, rows_written):
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET pages_done = ?, rows_written = ? WHERE id = ?',
+                               (pages_done, rows_written, job_id))
+
+    def finish(self, job_id, status, error=None):
+        with self._lock:
+            self._conn.execute('UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?',
+                               (status, error, time.time(), job_id))
+
+    def requeue(self, job_id):
+        '''Put a job that was interrupted back in the queue; the checkpoint journal lets it resume.'''
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE id = ?", (job_id,))
+
+    def requeue_running(self):
+        '''Requeue jobs left 'running' by a daemon that was killed. Returns how many there were.'''
+        with self._lock:
+            cursor = self._conn.execute("UPDATE jobs SET status = 'queued', worker = NULL WHERE status = 'running'")
+        return cursor.rowcount
+
+    def cancel(self, job_id):
+        '''Cancel a job that has not started yet. Returns False if it is not queued.'''
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+        return cursor.rowcount == 1
+
+    def get(self, job_id):
+        with self._lock:
+            return self._job(self._conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone())
+
+    def jobs(self, status=None, limit=50):
+        '''The most recent jobs, newest first, optionally only those with the given status.'''
+        query = 'SELECT * FROM jobs' + (' WHERE status = ?' if status else '') + ' ORDER BY id DESC LIMIT ?'
+        with self._lock:
+            rows = self._conn.execute(query, (status, limit) if status else (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def close(self):
+        self._conn.close()
+
+
+class ScrapeDaemon:
+    '''Worker threads that each take a warm browser from a BrowserPool and run queued jobs with it.
+
+    Browsers are launched and logged in once, when the daemon starts; a job only navigates to its
+    search. Between jobs the pool restarts browsers that died, and during long jobs it recycles them
+    as usual. Stopping the daemon interrupts jobs between pages and puts them back in the queue.
+    '''
+
+    def __init__(self, job_queue, browser_pool, poll_interval=2.0):
+        self.job_queue = job_queue
+        self.browser_pool = browser_pool
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+
+    def serve(self):
+        '''Warm up every browser, then run jobs until stop() or Ctrl+C.'''
+        requeued = self.job_queue.requeue_running()
+        if requeued:
+            print(f"Requeued {requeued} jobs left running by an earlier daemon")
+        print(f"Starting {self.browser_pool.size} browsers...")
+        scrapers = [self.browser_pool.acquire() for _ in range(self.browser_pool.size)]
+        for scraper in scrapers:
+            self.browser_pool.release(scraper)
+
+        workers = [threading.Thread(target=self._work, args=(f"worker-{index}",), name=f"scrape-worker-{index}", daemon=True)
+                   for index in range(self.browser_pool.size)]
+        for worker in workers:
+            worker.start()
+        print(f"Ready: {len(workers)} warm browsers waiting for jobs in {self.job_queue.path}")
+        try:
+            while any(worker.is_alive() for worker in workers):
+                for worker in workers:
+                    worker.join(0.5)
+        except KeyboardInterrupt:
+            print("Stopping after the current pages...")
+            self.stop()
+            for worker in workers:
+                worker.join()
+        finally:
+            self.browser_pool.close()
+
+    def stop(self):
+        self._stop.set()
+
+    def _work(self, name):
+        while not self._stop.is_set():
+            job = self.job_queue.claim(name)
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            with self.browser_pool.lease() as scraper:
+                self.run_job(scraper, job)
+
+    def run_job(self, scraper, job):
+        '''Scrape one job into its sink with a warm scraper, reporting progress after every page.'''
+        from main import APOLLO_MAX_PAGES, PEOPLE_PAGE_SIZE
+        from query_planner import result_pages
+        from sinks import open_sink
+
+        job_id = job['id']
+        print(f"Job {job_id}: {job['filters'] or 'no filters'} at {job['base_url']} into {job['sink_path']}")
+        started = time.perf_counter()
+        pages = 0
+        rows = 0
+        interrupted = False
+        try:
+            if not scraper.open_search(job['base_url'], job['filters'], job_id):
+                raise RuntimeError("search did not load")
+            num_pages = job['num_pages']
+            if not num_pages:
+                result_count = scraper._read_result_count()
+                num_pages = result_pages(result_count, PEOPLE_PAGE_SIZE, APOLLO_MAX_PAGES) if result_count else APOLLO_MAX_PAGES
+
+            with open_sink(job['sink_path']) as sink:
+                pages_iter = scraper.iter_pages(num_pages)
+                try:
+                    for batch in pages_iter:
+                        # A page is only checkpointed when the next one is requested, so stop before
+                        # writing one: the requeued job scrapes it again instead of appending it twice
+                        if self._stop.is_set():
+                            interrupted = True
+                            break
+                        scraper._write_batch(batch, sink)
+                        pages += 1
+                        rows += len(batch)
+                        self.job_queue.progress(job_id, pages, rows)
+                finally:
+                    pages_iter.close()
+        except Exception as e:
+            print(f"Job {job_id} failed after {pages} pages: {e}")
+            self.job_queue.finish(job_id, 'failed', str(e))
+            return
+
+        if interrupted:
+            print(f"Job {job_id} interrupted after {pages} pages; requeued")
+            self.job_queue.requeue(job_id)
+            return
+        self.job_queue.finish(job_id, 'done')
+        print(f"Job {job_id} done: {pages} pages, {rows} rows in {time.perf_counter() - started:.0f}s")
+
+
+def print_jobs(jobs):
+    print(f"{'id':>5} {'pri':>4} {'status':<9} {'pages':>9} {'rows':>7}  sink / filters")
+    for job in jobs:
+        budget = job['num_pages'] or 'all'
+        print(f"{job['id']:>5} {job['priority']:>4} {job['status']:<9} {job['pages_done']:>4}/{budget:<4} "
+              f"{job['rows_written']:>7}  {job['sink_path']} {json.dumps(job['filters'])}")
+        if job['error']:
+            print(f"{'':>20}error: {job['error']}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--queue', default='jobs.db')
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve')
+    serve_parser.add_argument('--workers', type=int, default=2)
+    submit_parser = commands.add_parser('submit')
+    submit_parser.add_argument('--base-url', default=None, help="people search or saved list URL (default: main.BASE_URL)")
+    submit_parser.add_argument('--filters', default='{}', help='FILTERS as JSON')
+    submit_parser.add_argument('--pages', type=int, default=None)
+    submit_parser.add_argument('--sink', required=True, help='.csv, .jsonl, .parquet or .db')
+    submit_parser.add_argument('--priority', type=int, default=0)
+    status_parser = commands.add_parser('status')
+    status_parser.add_argument('job_id', type=int, nargs='?')
+    status_parser.add_argument('--status', choices=JOB_STATUSES)
+    cancel_parser = commands.add_parser('cancel')
+    cancel_parser.add_argument('job_id', type=int)
+    args = arg_parser.parse_args()
+
+    job_queue = JobQueue(args.queue)
+    if args.command == 'submit':
+        base_url = args.base_url
+        if base_url is None:
+            from main import BASE_URL as base_url
+        job_id = job_queue.submit(base_url, json.loads(args.filters), args.sink, args.pages, args.priority)
+        print(f"Queued job {job_id}")
+    elif args.command == 'status':
+        if args.job_id and job_queue.get(args.job_id) is None:
+            print(f"No job {args.job_id}")
+        else:
+            print_jobs([job_queue.get(args.job_id)] if args.job_id else job_queue.jobs(args.status))
+    elif args.command == 'cancel':
+        print(f"Cancelled job {args.job_id}" if job_queue.cancel(args.job_id) else f"Job {args.job_id} is not queued")
+    else:
+        from browser_pool import BrowserPool
+        from checkpoint import CheckpointJournal
+        from filter_plan import FilterPlanCache
+        from main import (BASE_URL, BROWSER_MAX_PAGES, BROWSER_MAX_RSS_MB, BROWSER_PROFILE, EMAIL, RATE_GOVERNOR_DB,
+                          ApolloScraper)
+        from rate_governor import RateGovernor
+        from session import SessionCache
+
+        user_agents = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36"]
+        session_cache = SessionCache('sessions')
+        filter_plans = FilterPlanCache('filter_plans.json')
+        checkpoint = CheckpointJournal('crawl_checkpoint.jsonl')
+        rate_governor = RateGovernor(RATE_GOVERNOR_DB, EMAIL) if RATE_GOVERNOR_DB else None
+        browser_pool = BrowserPool(
+            lambda: ApolloScraper(user_agents, BASE_URL, checkpoint=checkpoint, session_cache=session_cache,
+                                  filter_plans=filter_plans, rate_governor=rate_governor, browser_profile=BROWSER_PROFILE),
+            size=args.workers, max_pages=BROWSER_MAX_PAGES, max_rss_mb=BROWSER_MAX_RSS_MB,
+        )
+        ScrapeDaemon(job_queue, browser_pool).serve()
+    job_queue.close()
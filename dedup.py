@@ -0,0 +1,95 @@
+import re
+import sqlite3
+import time
+from urllib.parse import unquote
+
+from records import record_from_row
+
+MISSING_VALUES = ('', 'N/A', 'Requires Access')
+
+LINKEDIN_PROFILE_RE = re.compile(r'linkedin\.com/in/([^/?#]+)', re.IGNORECASE)
+
+
+def _clean(value):
+    '''Collapse whitespace and case so cosmetic differences do not split identities.'''
+    if value is None:
+        return ''
+    value = ' '.join(str(value).split()).casefold()
+    return '' if value in ('n/a', 'requires access') else value
+
+
+def normalize_linkedin_url(url):
+    '''Reduce a LinkedIn profile URL to its slug (drops scheme, subdomain, query and trailing slash).'''
+    if not url or url in MISSING_VALUES:
+        return None
+    match = LINKEDIN_PROFILE_RE.search(unquote(str(url)))
+    return match.group(1).casefold() if match else None
+
+
+def identity_key(record):
+    '''Return a stable identity for a PersonRecord (or a display-keyed row), or None if it has nothing to identify it by.
+
+    The Personal LinkedIn URL wins; otherwise the full name plus Business Name is used. Volatile
+    fields such as email and phone never take part, so a changed 'Requires Access' is still a duplicate.
+    '''
+    if isinstance(record, dict):
+        record = record_from_row(record)
+    slug = normalize_linkedin_url(record.personal_linkedin)
+    if slug:
+        return f"li:{slug}"
+
+    name = ' '.join(part for part in (_clean(record.first_name), _clean(record.last_name)) if part)
+    if not name:
+        return None
+    return f"name:{name}|{_clean(record.business_name)}"
+
+
+class DedupIndex:
+    '''On-disk set of person identities that persists across runs.'''
+
+    def __init__(self, path):
+        self.path = path
+        # May be handed to a writer thread (see pipeline.py); it is only ever used from one thread at a time
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, first_seen REAL) WITHOUT ROWID'
+        )
+        self._conn.commit()
+        self.skipped = 0
+
+    def __contains__(self, row):
+        key = identity_key(row)
+        if key is None:
+            return False
+        return self._conn.execute('SELECT 1 FROM seen WHERE key = ?', (key,)).fetchone() is not None
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def add(self, row):
+        '''Record the row's identity. Returns True if it was new, False if it was already indexed.'''
+        key = identity_key(row)
+        if key is None:
+            return True
+        cursor = self._conn.execute('INSERT OR IGNORE INTO seen (key, first_seen) VALUES (?, ?)', (key, time.time()))
+        return cursor.rowcount == 1
+
+    def filter_new(self, rows):
+        '''Return only the rows whose identity has not been seen before, marking them as seen.
+
+        Call commit() once the returned rows have been persisted.
+        '''
+        new_rows = [row for row in rows if self.add(row)]
+        self.skipped += len(rows) - len(new_rows)
+        return new_rows
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        '''Close the index. Rows marked since the last commit() are dropped: they were never persisted.'''
+        if self._conn:
+            self._conn.rollback()
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import parse_qsl, urlencode
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# FILTERS key -> query parameter of Apollo's people search hash route (#/people?...).
+# Parameters ending in [] take one entry per value.
+FILTER_PARAMS = {
+    'email_status': 'contactEmailStatusV2[]',
+    'seniorities': 'personSeniorities[]',
+    'location': 'personLocations[]',
+    'locations': 'personLocations[]',
+    'titles': 'personTitles[]',
+    'employee_ranges': 'organizationNumEmployeesRanges[]',
+    'keywords': 'qKeywords',
+    'sort_by': 'sortByField',
+    'sort_ascending': 'sortAscending',
+}
+
+# Text of the pagination label next to the Next button, e.g. "1 - 25 of 2,345"
+RESULT_RANGE_JS = '''
+const next = document.querySelector('button[aria-label="Next"]');
+return next && next.parentElement ? next.parentElement.textContent : null;
+'''
+
+RESULT_RANGE_RE = re.compile(r'\bof\s+([\d][\d,.]*)\s*([KM]?)', re.IGNORECASE)
+
+
+def _param_value(value):
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (list, tuple)):
+        # Employee ranges are written as "min,max", with an open end left empty
+        return ','.join('' if v is None else str(v) for v in value)
+    return str(value)
+
+
+def compile_filter_url(base_url, filters):
+    '''Encode filters into the hash-route query of base_url, so one driver.get() applies them all.
+
+    Filters already in base_url's query are replaced and the page number is dropped. Raises ValueError for filters that have no URL form.
+    '''
+    unsupported = [key for key in filters if key not in FILTER_PARAMS]
+    if unsupported:
+        raise ValueError(f"No URL form for filter(s): {', '.join(unsupported)}")
+
+    base, _, fragment = base_url.partition('#')
+    route, _, query = fragment.partition('?')
+    # Changing the filters changes the result pages, so start from the first one
+    names = {FILTER_PARAMS[key] for key in filters} | {'page'}
+    params = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in names]
+    for key, value in filters.items():
+        name = FILTER_PARAMS[key]
+        values = value if isinstance(value, list) and name.endswith('[]') else [value]
+        params.extend((name, _param_value(v)) for v in values)
+    return f"{base}#{route}?{urlencode(params, safe='[],')}"
+
+
+def parse_result_count(text):
+    '''Read the total from a pagination label like "1 - 25 of 2,345" (abbreviated totals such as 2.1M are approximate).'''
+    if not text:
+        return None
+    match = RESULT_RANGE_RE.search(text)
+    if not match:
+        return None
+    number, suffix = match.group(1), match.group(2).upper()
+    if suffix:
+        return int(float(number.replace(',', '')) * {'K': 1_000, 'M': 1_000_000}[suffix])
+    return int(number.replace(',', '').replace('.', ''))
+
+
+@contextmanager
+def _file_lock(path):
+    '''Hold an exclusive lock on path (created if missing) across processes.'''
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _plan_key(base_url, filters):
+    return hashlib.sha1(json.dumps([base_url, filters], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class FilterPlanCache:
+    '''Compiled filter URLs that were checked against the UI, with the result count seen at the time.
+
+    A plan is only trusted once the UI path confirmed that the URL gives the same results, so a
+    renamed query parameter shows up as a count mismatch instead of a silently unfiltered crawl.
+    Filters the UI cannot set are recorded as unchecked: only their result count guards them.
+    '''
+
+    def __init__(self, path='filter_plans.json', tolerance=0.05):
+        self.path = path
+        # Result counts drift as Apollo's data changes; this much relative change still counts as a match
+        self.tolerance = tolerance
+        self._plans = self._read()
+        # Shared by the scrapers of a daemon's worker threads; other processes (coordinator shards)
+        # are kept out by the lock file around every read-merge-write
+        self._lock = threading.Lock()
+        self._lock_path = f"{self.path}.lock"
+
+    def _read(self):
+        if not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError:
+            print(f"Ignoring unreadable filter plan cache {self.path}")
+            return {}
+
+    def _write(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._plans, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @contextmanager
+    def _update(self):
+        '''Re-read the file under both locks, let the caller change the plans, and write them back.'''
+        with self._lock, _file_lock(self._lock_path):
+            self._plans = self._read()
+            yield self._plans
+            self._write()
+
+    def get(self, base_url, filters):
+        '''Return the plan ({'url', 'result_count', 'verified_at', 'unchecked'}) for these filters, or None.
+
+        'unchecked' lists the filters that were only ever applied through the URL, never checked against the UI.
+        '''
+        # Files are only ever replaced whole, so reading needs no lock; this picks up other processes' plans
+        self._plans = self._read()
+        return self._plans.get(_plan_key(base_url, filters))
+
+    def matches(self, plan, result_count):
+        '''True if result_count is close enough to the count recorded when the plan was verified.'''
+        if plan is None or result_count is None or plan.get('result_count') is None:
+            return False
+        expected = plan['result_count']
+        return abs(result_count - expected) <= max(1, expected * self.tolerance)
+
+    def record(self, base_url, filters, url, result_count, unchecked=()):
+        with self._update() as plans:
+            plans[_plan_key(base_url, filters)] = {
+                'filters': filters,
+                'url': url,
+                'result_count': result_count,
+                'verified_at': time.time(),
+                'unchecked': sorted(unchecked),
+            }
+
+    def invalidate(self, base_url, filters):
+        with self._update() as plans:
+            plans.pop(_plan_key(base_url, filters), None)
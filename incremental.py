@@ -0,0 +1,206 @@
+'''Re-crawl a search and keep only what changed since the last crawl of the same filter set.
+
+    python incremental.py --pages 100 --stop-after 3     # writes delta-<date>.jsonl
+'''
+import argparse
+import hashlib
+import json
+import sqlite3
+import time
+
+from checkpoint import crawl_key
+from dedup import identity_key
+from records import record_to_row, to_value
+
+# Newest-first order for incremental crawls, so unchanged pages pile up at the end of the search.
+# The field name is the one Apollo's URL showed for "last updated" sorting; check it against the
+# address bar after picking that sort in the UI if incremental crawls never stop early.
+RECENCY_SORT = {'sort_by': 'person_last_updated_at', 'sort_ascending': False}
+
+
+def recency_filters(filters):
+    '''filters with the results sorted newest first.'''
+    return dict(filters, **RECENCY_SORT)
+
+
+def record_hash(record):
+    '''Content hash of every field of a PersonRecord.'''
+    payload = json.dumps([to_value(value, None) for value in record], ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def page_hash(row_hashes):
+    return hashlib.sha1(''.join(row_hashes).encode('ascii')).hexdigest()
+
+
+class DeltaIndex:
+    '''Content hashes of every row and page from earlier crawls, per filter set (scope).'''
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(self.path, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS row_hashes ('
+            'scope TEXT, key TEXT, hash TEXT, first_seen REAL, last_changed REAL, PRIMARY KEY (scope, key)) WITHOUT ROWID'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS page_hashes (scope TEXT, page INTEGER, hash TEXT, PRIMARY KEY (scope, page)) WITHOUT ROWID'
+        )
+        self._conn.commit()
+
+    def classify(self, scope, page, records):
+        '''Split a page into ('insert' | 'update', record) changes and record the new hashes (uncommitted).
+
+        A page whose hash matches the one stored for the same page number is skipped without
+        looking at its rows.
+        '''
+        hashes = [record_hash(record) for record in records]
+        new_page_hash = page_hash(hashes)
+        row = self._conn.execute('SELECT hash FROM page_hashes WHERE scope = ? AND page = ?', (scope, page)).fetchone()
+        if row is not None and row[0] == new_page_hash:
+            return []
+        self._conn.execute('INSERT OR REPLACE INTO page_hashes (scope, page, hash) VALUES (?, ?, ?)',
+                           (scope, page, new_page_hash))
+
+        changes = []
+        now = time.time()
+        for record, content_hash in zip(records, hashes):
+            # Rows with nothing to identify them by are keyed by their content
+            key = identity_key(record) or f"hash:{content_hash}"
+            row = self._conn.execute('SELECT hash FROM row_hashes WHERE scope = ? AND key = ?', (scope, key)).fetchone()
+            if row is None:
+                changes.append(('insert', record))
+                self._conn.execute(
+                    'INSERT INTO row_hashes (scope, key, hash, first_seen, last_changed) VALUES (?, ?, ?, ?, ?)',
+                    (scope, key, content_hash, now, now),
+                )
+            elif row[0] != content_hash:
+                changes.append(('update', record))
+                self._conn.execute('UPDATE row_hashes SET hash = ?, last_changed = ? WHERE scope = ? AND key = ?',
+                                   (content_hash, now, scope, key))
+        return changes
+
+    def known_rows(self, scope):
+        return self._conn.execute('SELECT COUNT(*) FROM row_hashes WHERE scope = ?', (scope,)).fetchone()[0]
+
+    def commit(self):
+        self._conn.commit()
+
+    def close(self):
+        if self._conn:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+
+class DeltaWriter:
+    '''JSON Lines file of changed rows: the display columns (missing values as null) plus a "Change" column.
+
+    JsonlSink reads it back like any other JSON Lines sink; the extra column is ignored there.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+        self.counts = {'insert': 0, 'update': 0}
+        self._file = None
+
+    def write(self, changes, page):
+        if not changes:
+            return 0
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        lines = []
+        for change, record in changes:
+            lines.append(json.dumps({'Change': change, 'Page': page, **record_to_row(record, na=None)}, ensure_ascii=False) + '\n')
+            self.counts[change] += 1
+        self._file.write(''.join(lines))
+        self._file.flush()
+        return len(changes)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class IncrementalCrawl:
+    '''Crawl a recency-sorted search until stop_after pages in a row bring no new or changed people.
+
+    The scraper must not have a dedup index, which would hide the people whose details changed,
+    nor a checkpoint journal, since an early stop is a finished crawl rather than one to resume.
+    '''
+
+    def __init__(self, scraper, delta_index, delta_path, stop_after=3):
+        if scraper.dedup_index is not None or scraper.checkpoint is not None:
+            raise ValueError("Incremental crawls need a scraper without a dedup index or checkpoint journal")
+        self.scraper = scraper
+        self.delta_index = delta_index
+        self.delta = DeltaWriter(delta_path)
+        self.stop_after = stop_after
+
+    def run(self, num_pages_to_scrape):
+        '''Crawl and write the delta file. Returns {'pages', 'insert', 'update', 'stopped_early'}.'''
+        scraper = self.scraper
+        scope = crawl_key(scraper.base_url, scraper.filters)
+        if self.delta_index.known_rows(scope) == 0:
+            print("No earlier crawl of this filter set; every row is new")
+        pages = 0
+        unchanged_streak = 0
+        stopped_early = False
+        pages_iter = scraper.iter_pages(num_pages_to_scrape)
+        try:
+            for batch in pages_iter:
+                pages += 1
+                page = batch.page or pages
+                changes = self.delta_index.classify(scope, page, list(batch))
+                self.delta.write(changes, page)
+                self.delta_index.commit()
+                for change, _ in changes:
+                    scraper.metrics.incr('delta_rows', change=change)
+                print(f"Result page {page}: {len(changes)} new or changed rows")
+
+                unchanged_streak = 0 if changes else unchanged_streak + 1
+                if unchanged_streak >= self.stop_after:
+                    print(f"{unchanged_streak} pages in a row without changes; the rest of the search is known")
+                    stopped_early = True
+                    break
+        finally:
+            # Stops the crawl generator, which leaves the browser on the last page it read
+            pages_iter.close()
+            self.delta.close()
+
+        print(f"Incremental crawl: {pages} pages, {self.delta.counts['insert']} new and "
+              f"{self.delta.counts['update']} changed rows written to {self.delta.path}")
+        return {'pages': pages, 'stopped_early': stopped_early, **self.delta.counts}
+
+
+if __name__ == "__main__":
+    from browser_pool import BrowserPool
+    from filter_plan import FilterPlanCache
+    from main import BASE_URL, EMAIL, FILTERS, RATE_GOVERNOR_DB, ApolloScraper
+    from rate_governor import RateGovernor
+    from session import SessionCache
+
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--pages', type=int, default=100)
+    arg_parser.add_argument('--stop-after', type=int, default=3)
+    arg_parser.add_argument('--index', default='delta_index.db')
+    arg_parser.add_argument('--delta', default=f"delta-{time.strftime('%Y-%m-%d')}.jsonl")
+    args = arg_parser.parse_args()
+
+    user_agents = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36"]
+    rate_governor = RateGovernor(RATE_GOVERNOR_DB, EMAIL) if RATE_GOVERNOR_DB else None
+    browser_pool = BrowserPool(
+        lambda: ApolloScraper(user_agents, BASE_URL, recency_filters(FILTERS), session_cache=SessionCache('sessions'),
+                              filter_plans=FilterPlanCache('filter_plans.json'), rate_governor=rate_governor),
+    )
+    delta_index = DeltaIndex(args.index)
+    try:
+        scraper = browser_pool.acquire()
+        IncrementalCrawl(scraper, delta_index, args.delta, stop_after=args.stop_after).run(args.pages)
+    finally:
+        browser_pool.close()
+        delta_index.close()
+        if rate_governor is not None:
+            rate_governor.close()
@@ -1,11 +1,11 @@
-import os
+import asyncio
+import queue
 import random
 import time
-import pandas as pd
 from itertools import zip_longest 
-from bs4 import BeautifulSoup
+from urllib.parse import parse_qsl, urlencode
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
@@ -14,20 +14,44 @@ from selenium.webdriver.common.keys import Keys
 import undetected_chromedriver as uc
 from selenium_stealth import stealth
 
+import requests
+
+from browser_pool import BrowserPool
+from browser_profiles import apply_profile_driver, apply_profile_options, get_browser_profile
+from api import ApolloApiClient, capture_search_traffic, enable_network_capture
+from checkpoint import CheckpointJournal, crawl_key
+from dedup import DedupIndex, identity_key
+from filter_plan import RESULT_RANGE_JS, FilterPlanCache, compile_filter_url, parse_result_count
+from metrics import Metrics
+from waits import PageWaiter
+from session import SessionCache
+from pipeline import ScrapePipeline
+from rate_governor import RateGovernor
+from parsers import (HEADER_CELLS_JS, LIST_COLUMN_HEADERS, PEOPLE_FIELD_SELECTORS, ROW_FIELDS_JS, ROWGROUP_HTML_JS,
+                     ScriptResultParser, column_field_selectors, get_parser, list_field_columns, parse_snapshot)
+from records import RecordBatch
+from sinks import open_sink
+
 # --- Configuration Variables ---
 EMAIL = ''
 PASSWORD = ''
 
+APP_URL = "https://app.apollo.io/"
+
 # Instead of full URL with filters, use base URL and configure filters separately
 BASE_URL = "https://app.apollo.io/#/people"
 
-# Filter configuration
+# Filter configuration. login() encodes these into the search URL (see filter_plan.py) and checks the
+# result count against the UI filters the first time a filter set is used.
 FILTERS = {
     'email_status': 'verified',  # verified, likely_to_engage, guessed, unavailable
     'seniorities': ['owner', 'entry'],  # owner, entry, senior, manager, etc.
     'location': 'United States',
 }
 
+# FILTERS keys that _apply_filters() can set through the filter panel
+UI_FILTERS = ('email_status', 'seniorities', 'location')
+
 LOGIN_BUTTON_XPATH = "//button[normalize-space()='Log In']"
 CF_MODAL_XPATH = "//div[contains(@class, 'zp-modal-mask')]"
 DASHBOARD_ELEMENT_XPATH = "//*[@id='main-app']"
@@ -40,26 +64,106 @@ NEXT_PAGE_BUTTON_CSS = 'button[aria-label="Next"]'
 # Selectors for LIST page
 LIST_HEADER_XPATH = "//div[normalize-space()='List Name']"
 LIST_TABLE_BODY_SELECTOR = 'div[role="rowgroup"]:not(.zp_BkjQG)'
+
+# Saved lists are read at the largest page size Apollo accepts, through this hash-route parameter,
+# to cut the number of paginations. If Apollo ignores it, the list is read at its default page size.
+LIST_PAGE_SIZE_PARAM = 'perPage'
+LIST_PAGE_SIZE = 100
+
+# Apollo stops paginating a people search after this many pages of PEOPLE_PAGE_SIZE rows.
+# Bigger searches have to be split into smaller ones (see query_planner.py).
+APOLLO_MAX_PAGES = 100
+PEOPLE_PAGE_SIZE = 25
+
+# How rows are pulled out of the browser:
+#   'script'      - one execute_script call returns the row fields as JSON (smallest transfer)
+#   'rowgroup'    - one execute_script call returns only the table body's outerHTML
+#   'page_source' - serialize the whole DOM (always used as the fallback)
+#   'api'         - read the search API's JSON responses from Chrome's network log; no HTML at all
+EXTRACTION_MODES = ('script', 'rowgroup', 'page_source', 'api')
+
+# Random pause between pages in seconds, on top of waiting for the table to re-render.
+# Set to None to go as fast as Apollo renders.
+POLITENESS_DELAY = (1.0, 3.0)
+
+# Pace page loads with a token bucket shared by every browser of the account (see rate_governor.py)
+# instead of POLITENESS_DELAY: faster while pages load quickly, backing off on challenges and timeouts.
+# Set to None to use the fixed delay.
+RATE_GOVERNOR_DB = 'rate_governor.db'
+
+# Parse pages in this many worker processes while the browser moves on to the next page
+# (see pipeline.py). Set to 0 to parse in-line.
+PARSE_WORKERS = 2
+
+# Browser profile from browser_profiles.py: 'full' (headed, loads everything) or 'lean'
+# (headless, with images, fonts and trackers blocked; fits more browsers per machine)
+BROWSER_PROFILE = 'full'
+
+# Replace the browser after this many pages or once it uses this much memory (see browser_pool.py).
+# Chrome grows steadily over hundreds of in-app paginations.
+BROWSER_MAX_PAGES = 300
+BROWSER_MAX_RSS_MB = 1500
 # -------------------------------
 
+def set_hash_param(url, name, value):
+    '''Set a query parameter inside the hash route of an Apollo URL (e.g. #/people?page=3).'''
+    base, _, fragment = url.partition('#')
+    route, _, query = fragment.partition('?')
+    params = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k != name]
+    params.append((name, str(value)))
+    return f"{base}#{route}?{urlencode(params, safe='[]')}"
+
+
 class ApolloScraper:
-    def __init__(self, user_agents, base_url, filters=None):
+    def __init__(self, user_agents, base_url, filters=None, dedup_index=None, parser='lxml', extraction_mode='script',
+                 politeness_delay=POLITENESS_DELAY, user_data_dir=None, checkpoint=None, session_cache=None,
+                 api_fixture_dir=None, metrics=None, browser_profile=BROWSER_PROFILE, browser_pool=None,
+                 filter_plans=None, rate_governor=None, app_url=APP_URL):
         '''Initialize the scraper with user agents, login credentials, and URL.'''
+        if extraction_mode not in EXTRACTION_MODES:
+            raise ValueError(f"Unknown extraction mode '{extraction_mode}'. Choose one of: {', '.join(EXTRACTION_MODES)}")
         self.user_agents = user_agents
         self.base_url = base_url
+        # Where the login form lives; mock_apollo.py serves a local stand-in
+        self.app_url = app_url
         self.filters = filters or {}
+        self.dedup_index = dedup_index
+        self.checkpoint = checkpoint
+        # Daemon job the current search belongs to; part of its checkpoint key (see open_search)
+        self.job_id = None
+        self.session_cache = session_cache
+        self.api_fixture_dir = api_fixture_dir
+        # FilterPlanCache of filter URLs already checked against the UI; without one every login checks again
+        self.filter_plans = filter_plans
+        # RateGovernor shared by the account's browsers; replaces the fixed politeness delay when set
+        self.rate_governor = rate_governor
+        self.metrics = metrics or Metrics()
+        self.extraction_mode = extraction_mode
+        self.parser = get_parser(parser, PEOPLE_TABLE_BODY_SELECTOR, PEOPLE_ROW_SELECTOR)
+        self.script_parser = ScriptResultParser(PEOPLE_TABLE_BODY_SELECTOR, PEOPLE_ROW_SELECTOR, self.parser.field_selectors)
+        self.user_data_dir = user_data_dir
+        self.browser_profile = get_browser_profile(browser_profile)
+        # Set by BrowserPool; lets long crawls recycle and restart the browser between pages
+        self.browser_pool = browser_pool
         self.driver = self.setup_webdriver()
+        self.waiter = PageWaiter(self.driver, PEOPLE_TABLE_BODY_SELECTOR, PEOPLE_ROW_SELECTOR, politeness=politeness_delay,
+                                 metrics=self.metrics)
         self.page_type = None
 
     def setup_webdriver(self):
         '''Set up the Undetected Chrome WebDriver with stealth options.'''
         options = uc.ChromeOptions()
         options.add_argument(f"user-agent={random.choice(self.user_agents)}")
-        # options.add_argument("--headless")
+        if self.extraction_mode == 'api':
+            enable_network_capture(options)
+        apply_profile_options(options, self.browser_profile)
+
+        # A dedicated profile directory lets several browsers run side by side without sharing state.
+        # uc.Chrome picks --headless=new and hides the headless markers itself.
+        self.driver = uc.Chrome(options=options, user_data_dir=self.user_data_dir,
+                                headless=self.browser_profile['headless'])
+        apply_profile_driver(self.driver, self.browser_profile)
 
-        self.driver = uc.Chrome(options=options)
-        self.driver.maximize_window()
-        
         stealth(self.driver,
                 languages=["en-US", "en"],
                 vendor="Google Inc.",
@@ -71,56 +175,34 @@ class ApolloScraper:
         return self.driver
 
     def login(self):
-        '''Perform login and navigate to the people page.'''
-        self.driver.get("https://app.apollo.io/")
-        wait = WebDriverWait(self.driver, 60)
+        '''Perform login and navigate to the people page. A valid cached session or a still logged-in profile skips the login form.
 
+        Returns True once the results are showing.
+        '''
         try:
-            # 1. Login Steps
-            print("Logging in...")
-            email_input = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[name='email']")))
-            email_input.send_keys(EMAIL)
-            password_input = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[name='password']")))
-            password_input.send_keys(PASSWORD)
-            log_in_button = wait.until(EC.element_to_be_clickable((By.XPATH, LOGIN_BUTTON_XPATH)))
-            log_in_button.click()
-
-            # 2. Wait for verification modal to disappear
-            wait.until(EC.presence_of_element_located((By.XPATH, DASHBOARD_ELEMENT_XPATH)))
-            print("Waiting for verification modal to disappear...")
-            wait.until(EC.invisibility_of_element_located((By.XPATH, CF_MODAL_XPATH)))
-            
-            # 3. Wait for default page
-            time.sleep(3)
-            
-            # 4. Navigate to base URL (people page)
-            print(f"Navigating to: {self.base_url}")
-            self.driver.get(self.base_url)
-            time.sleep(5)
-            
-            # 5. Detect page type
-            self._detect_page_type()
+            # 1. Reuse a cached session or the profile's own login, or log in with credentials and cache the new session
+            with self.metrics.span('session_restore'):
+                restored = self._restore_session() or self._profile_session()
+            if not restored:
+                with self.metrics.span('credentials'):
+                    self._submit_credentials()
+                if self.session_cache is not None:
+                    self.session_cache.save(self.driver, EMAIL)
             
-            # 6. Apply filters if on people page
-            if self.page_type == 'people' and self.filters:
-                print("Applying filters through UI...")
-                self._apply_filters()
-            
-            # 7. Wait for data to load
-            if self.page_type == 'people':
-                print("Waiting for people data to load...")
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, PEOPLE_TABLE_BODY_SELECTOR)))
-                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, f'{PEOPLE_TABLE_BODY_SELECTOR} {PEOPLE_ROW_SELECTOR}')))
-                time.sleep(3)
-            elif self.page_type == 'list':
-                print("Waiting for list data to load...")
-                wait.until(EC.presence_of_element_located((By.XPATH, LIST_HEADER_XPATH)))
-                time.sleep(3)
+            # 2. Navigate to base URL (people page); a restored session is already there
+            if not restored:
+                print(f"Navigating to: {self.base_url}")
+                self.driver.get(self.base_url)
+
+            # 3-5. Detect the page type, apply filters and wait for the data
+            self._prepare_results()
             
             print("Successfully logged in and page is ready!")
             print(f"Final URL: {self.driver.current_url}")
+            return True
 
         except TimeoutException as e:
+            self.metrics.incr('login_failures', reason='timeout')
             print(f"Login failed: Timeout - {e}")
             print(f"Current URL: {self.driver.current_url}")
             self.driver.save_screenshot("login_timeout_error.png")
@@ -131,10 +213,163 @@ class ApolloScraper:
             print("Saved page source to page_source_debug.html for inspection")
             
         except Exception as e:
+            self.metrics.incr('login_failures', reason='error')
             print(f"Unexpected error during login: {e}")
-            print(f"Current URL: {self.driver.current_url}")
-            self.driver.save_screenshot("login_unexpected_error.png")
+            try:
+                print(f"Current URL: {self.driver.current_url}")
+                self.driver.save_screenshot("login_unexpected_error.png")
+            except WebDriverException:
+                print("Browser is not responding")
+        return False
+
+    def open_search(self, base_url, filters=None, job_id=None):
+        '''Point the logged-in browser at another people search or saved list, without logging in again.
+
+        With a job_id, the search is checkpointed separately from other jobs running the same search.
+        Returns True once its results are showing.
+        '''
+        self.base_url = base_url
+        self.filters = filters or {}
+        self.job_id = job_id
+        try:
+            print(f"Navigating to: {self.base_url}")
+            # Going from one search to another only changes the hash route, which keeps the old table
+            # on screen until the app re-renders; a blank page first makes every wait below see the new one
+            self.driver.get('about:blank')
+            self.driver.get(self.base_url)
+            self._prepare_results()
+        except TimeoutException as e:
+            print(f"Search did not load: Timeout - {e}")
+            return False
+        print(f"Search is ready: {self.driver.current_url}")
+        return True
+
+    def _prepare_results(self):
+        '''Wait for the app at base_url, detect the page type, apply the filters and wait for the first rows.'''
+        self.waiter.wait_for_document_ready('base_url_load', 60)
+        self.waiter.wait_for('base_url_app', EC.presence_of_element_located((By.XPATH, DASHBOARD_ELEMENT_XPATH)), 60)
+
+        # 3. Detect page type
+        self._detect_page_type()
+
+        # 4. Apply filters if on people page
+        if self.page_type == 'people' and self.filters:
+            self._apply_filter_plan()
+
+        # 5. Wait for data to load
+        if self.page_type == 'people':
+            # A saved list opened earlier in this browser switched the parsers to its table
+            if self.parser.table_body_selector != PEOPLE_TABLE_BODY_SELECTOR:
+                self._use_table(PEOPLE_TABLE_BODY_SELECTOR, PEOPLE_FIELD_SELECTORS)
+            print("Waiting for people data to load...")
+            self.waiter.wait_for('people_rows', EC.presence_of_element_located((By.CSS_SELECTOR, f'{PEOPLE_TABLE_BODY_SELECTOR} {PEOPLE_ROW_SELECTOR}')), 60)
+        elif self.page_type == 'list':
+            print("Waiting for list data to load...")
+            self.waiter.wait_for('list_header', EC.presence_of_element_located((By.XPATH, LIST_HEADER_XPATH)), 60)
+            self._use_list_table()
+            self._apply_list_page_size()
+
+    def restart_browser(self, resume_page=None):
+        '''Replace the browser with a fresh one, log back in and return to result page resume_page.
+
+        The session cache and the persistent profile directory (if any) spare a full login; login()
+        applies the filters again. Returns False if the new browser could not get back to the results.
+        '''
+        self.quit()
+        self.setup_webdriver()
+        self.waiter.driver = self.driver
+        if not self.login():
+            return False
+        if resume_page and resume_page > 1:
+            try:
+                self.go_to_page(resume_page)
+            except TimeoutException:
+                print(f"Fresh browser could not reach result page {resume_page}")
+                return False
+        return True
+
+    def _submit_credentials(self):
+        '''Fill in the login form and wait until the app and any verification modal are through.'''
+        self.driver.get(self.app_url)
+        wait = WebDriverWait(self.driver, 60, poll_frequency=self.waiter.poll_frequency)
+
+        print("Logging in...")
+        email_input = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[name='email']")))
+        email_input.send_keys(EMAIL)
+        password_input = wait.until(EC.element_to_be_clickable((By.CSS_SELECTOR, "input[name='password']")))
+        password_input.send_keys(PASSWORD)
+        log_in_button = wait.until(EC.element_to_be_clickable((By.XPATH, LOGIN_BUTTON_XPATH)))
+        log_in_button.click()
+
+        # Wait for verification modal to disappear
+        self.waiter.wait_for('dashboard', EC.presence_of_element_located((By.XPATH, DASHBOARD_ELEMENT_XPATH)), 60)
+        print("Waiting for verification modal to disappear...")
+        self.waiter.wait_for('cf_modal', EC.invisibility_of_element_located((By.XPATH, CF_MODAL_XPATH)), 60)
+
+    def _restore_session(self):
+        '''Load the cached session and check Apollo still accepts it. Returns False if a full login is needed.'''
+        if self.session_cache is None or not self.session_cache.restore(self.driver, EMAIL, self.app_url):
+            return False
+
+        # restore() left the app booted logged out on app_url, and base_url differs from it only in the
+        # hash route; a blank page first makes the app load again and read the restored session
+        self.driver.get('about:blank')
+        self.driver.get(self.base_url)
+        state = self.waiter.try_wait_for('session_check', self._session_state, 20)
+        if state != 'valid':
+            print("Cached session has expired, falling back to full login")
+            self.session_cache.invalidate(EMAIL)
+            self.driver.delete_all_cookies()
+            return False
+
+        self.waiter.wait_for('cf_modal', EC.invisibility_of_element_located((By.XPATH, CF_MODAL_XPATH)), 60)
+        print("Cached session is valid, skipping login")
+        return True
+
+    def _profile_session(self):
+        '''Check whether the persistent profile directory is still logged in. Returns False if a full login is needed.'''
+        if self.user_data_dir is None:
+            return False
+
+        self.driver.get(self.base_url)
+        if self.waiter.try_wait_for('session_check', self._session_state, 20) != 'valid':
+            return False
+
+        self.waiter.wait_for('cf_modal', EC.invisibility_of_element_located((By.XPATH, CF_MODAL_XPATH)), 60)
+        print("Browser profile is still logged in, skipping login")
+        return True
+
+    def _session_state(self, driver):
+        '''Wait condition: 'expired' on the login form, 'valid' once app data shows up, False while loading.'''
+        if '/login' in driver.current_url or driver.find_elements(By.CSS_SELECTOR, "input[name='password']"):
+            return 'expired'
+        if driver.find_elements(By.CSS_SELECTOR, PEOPLE_TABLE_BODY_SELECTOR) or driver.find_elements(By.XPATH, LIST_HEADER_XPATH):
+            return 'valid'
+        return False
     
+    def _use_table(self, table_body_selector, field_selectors):
+        '''Point the parsers and waits at a different results table.'''
+        self.parser = get_parser(self.parser.name, table_body_selector, PEOPLE_ROW_SELECTOR, field_selectors)
+        self.script_parser = ScriptResultParser(table_body_selector, PEOPLE_ROW_SELECTOR, field_selectors)
+        self.waiter.table_body_selector = table_body_selector
+
+    def _use_list_table(self):
+        '''Read a saved list's columns from its header and parse its rows into the people schema.'''
+        columns = list_field_columns(self.driver.execute_script(HEADER_CELLS_JS) or [])
+        missing = [field for field in LIST_COLUMN_HEADERS if field not in columns]
+        if missing:
+            print(f"List does not show columns for: {', '.join(missing)}. These fields will be N/A.")
+        self._use_table(LIST_TABLE_BODY_SELECTOR, column_field_selectors(columns))
+
+    def _apply_list_page_size(self):
+        '''Reload the list at LIST_PAGE_SIZE rows per page, so it takes fewer paginations.'''
+        marker = self.waiter.page_marker()
+        self.driver.get(set_hash_param(self.driver.current_url, LIST_PAGE_SIZE_PARAM, LIST_PAGE_SIZE))
+        if self.waiter.try_wait_for_new_rows(marker, 'list_page_size', 15) is None:
+            print("Apollo kept the default list page size")
+        else:
+            print(f"List page size set to {LIST_PAGE_SIZE} rows")
+
     def _detect_page_type(self):
         '''Detect whether we're on a people page or a list page.'''
         try:
@@ -151,14 +386,96 @@ class ApolloScraper:
             print(f"Error detecting page type: {e}")
             self.page_type = 'people'
     
+    def _apply_filter_plan(self):
+        '''Apply filters by loading them as URL state, falling back to the UI when the URL cannot be trusted.
+
+        A filter set's URL is trusted once the UI filters, applied on top of it, left the result count
+        unchanged. Later logins load the cached URL and only compare the count with the one recorded then.
+        Filters the UI panel cannot set (see UI_FILTERS) are never part of that check, and the plan says so.
+        '''
+        try:
+            url = compile_filter_url(self.base_url, self.filters)
+        except ValueError as e:
+            print(f"{e}; applying filters through UI...")
+            with self.metrics.span('filters', method='ui'):
+                self._apply_filters()
+            return
+
+        plan = self.filter_plans.get(self.base_url, self.filters) if self.filter_plans is not None else None
+        print("Applying filters through URL...")
+        with self.metrics.span('filters', method='url'):
+            marker = self.waiter.page_marker()
+            self.driver.get(url)
+            self.waiter.wait_for_document_ready('filter_url_load', 60)
+            self.waiter.try_wait_for_new_rows(marker, 'filter_results')
+            url_count = self._read_result_count()
+        if plan is not None and plan['url'] == url and self.filter_plans.matches(plan, url_count):
+            print(f"Filter URL gave {url_count} results, as expected")
+            if plan.get('unchecked'):
+                print(f"Never checked against the UI: {', '.join(plan['unchecked'])}")
+            return
+
+        url_only = sorted(key for key in self.filters if key not in UI_FILTERS)
+        if len(url_only) == len(self.filters):
+            # Nothing to compare with; the count still guards later logins against drift
+            print(f"Filter URL gave {url_count} results; none of its filters can be checked against the UI")
+            if self.filter_plans is not None and url_count is not None:
+                self.filter_plans.record(self.base_url, self.filters, url, url_count, unchecked=url_only)
+            return
+
+        # Unverified or changed: apply the UI filters on top; they change nothing if the URL already applied them
+        print(f"Checking filter URL ({url_count} results) against the UI filters...")
+        with self.metrics.span('filters', method='ui'):
+            self._apply_filters()
+        ui_count = self._read_result_count()
+        if url_count is not None and url_count == ui_count:
+            print(f"Filter URL verified ({url_count} results)")
+            if url_only:
+                print(f"Applied through the URL only, not checked against the UI: {', '.join(url_only)}")
+            if self.filter_plans is not None:
+                self.filter_plans.record(self.base_url, self.filters, url, url_count, unchecked=url_only)
+            return
+
+        print(f"Filter URL gave {url_count} results but the UI filters {ui_count}; "
+              f"applying the UI filters to an unfiltered search")
+        self.metrics.incr('filter_plan_mismatches')
+        if self.filter_plans is not None:
+            self.filter_plans.invalidate(self.base_url, self.filters)
+        # The URL may have applied a wrong filter, which the UI filters would only narrow further
+        self.driver.get('about:blank')
+        self.driver.get(self.base_url)
+        self.waiter.wait_for_document_ready('base_url_load', 60)
+        self.waiter.wait_for('people_rows', EC.presence_of_element_located((By.CSS_SELECTOR, f'{PEOPLE_TABLE_BODY_SELECTOR} {PEOPLE_ROW_SELECTOR}')), 60)
+        with self.metrics.span('filters', method='ui'):
+            self._apply_filters()
+        if url_only:
+            print(f"The UI cannot apply {', '.join(url_only)}; the search runs without them")
+
+    def count_results(self, filters):
+        '''Load a filter set as URL state and return its total number of results (None if it did not show).
+
+        Leaves the browser on that search; self.filters is not changed.
+        '''
+        self._pace()
+        marker = self.waiter.page_marker()
+        self.driver.get(compile_filter_url(self.base_url, filters))
+        self.waiter.wait_for_document_ready('filter_url_load', 60)
+        self.waiter.try_wait_for_new_rows(marker, 'count_results')
+        return self._read_result_count()
+
+    def _read_result_count(self):
+        '''Total number of results from the pagination label ("1 - 25 of 2,345"), or None if it is not showing.'''
+        try:
+            return parse_result_count(self.driver.execute_script(RESULT_RANGE_JS))
+        except WebDriverException:
+            return None
+
     def _apply_filters(self):
         '''Apply filters through the UI instead of URL parameters.'''
-        wait = WebDriverWait(self.driver, 20)
+        wait = WebDriverWait(self.driver, 20, poll_frequency=self.waiter.poll_frequency)
+        marker_before_filters = self.waiter.page_marker()
         
         try:
-            # Wait for filter panel to be visible
-            time.sleep(2)
-            
             # 1. Apply Email Status filter
             if 'email_status' in self.filters:
                 print(f"Applying email status filter: {self.filters['email_status']}")
@@ -167,17 +484,16 @@ class ApolloScraper:
                     email_filter_xpath = "//span[text()='Email Status']"
                     email_accordion = wait.until(EC.element_to_be_clickable((By.XPATH, email_filter_xpath)))
                     email_accordion.click()
-                    time.sleep(1)
                     
                     # Click on the specific status (e.g., "Verified")
                     status_xpath = f"//div[contains(@class, 'zp_BsIHj') and text()='{self.filters['email_status'].capitalize()}']"
                     # If filter already applied, it might be in a badge, try to find checkbox instead
                     try:
-                        status_element = self.driver.find_element(By.XPATH, status_xpath)
+                        status_element = self.waiter.wait_for('filter_options', EC.presence_of_element_located((By.XPATH, status_xpath)), 5)
                         # Check if already applied (look for close button)
                         if not status_element.find_elements(By.CSS_SELECTOR, 'i.apollo-icon-times'):
                             status_element.click()
-                            time.sleep(1)
+                            self._wait_for_filter_selected(status_element)
                         print("Email status filter applied")
                     except:
                         print("Email status filter may already be applied or selector changed")
@@ -193,16 +509,15 @@ class ApolloScraper:
                     job_titles_xpath = "//span[text()='Job Titles']"
                     job_accordion = wait.until(EC.element_to_be_clickable((By.XPATH, job_titles_xpath)))
                     job_accordion.click()
-                    time.sleep(1)
                     
                     # Apply each seniority
                     for seniority in self.filters['seniorities']:
                         seniority_xpath = f"//div[contains(@class, 'zp_BsIHj') and text()='{seniority.capitalize()}']"
                         try:
-                            seniority_element = self.driver.find_element(By.XPATH, seniority_xpath)
+                            seniority_element = self.waiter.wait_for('filter_options', EC.presence_of_element_located((By.XPATH, seniority_xpath)), 5)
                             if not seniority_element.find_elements(By.CSS_SELECTOR, 'i.apollo-icon-times'):
                                 seniority_element.click()
-                                time.sleep(0.5)
+                                self._wait_for_filter_selected(seniority_element)
                             print(f"Seniority '{seniority}' applied")
                         except:
                             print(f"Could not apply seniority: {seniority}")
@@ -218,16 +533,17 @@ class ApolloScraper:
                     location_xpath = "//span[text()='Location']"
                     location_accordion = wait.until(EC.element_to_be_clickable((By.XPATH, location_xpath)))
                     location_accordion.click()
-                    time.sleep(1)
                     
                     # Type in the location search box
                     # This is trickier - might need to find the input within the opened accordion
-                    location_input = self.driver.find_element(By.CSS_SELECTOR, "input[placeholder*='location' i]")
-                    location_input.clear()
-                    location_input.send_keys(self.filters['location'])
-                    time.sleep(1)
-                    location_input.send_keys(Keys.ENTER)
-                    time.sleep(2)
+                    location_input = self.waiter.wait_for('filter_options', EC.element_to_be_clickable((By.CSS_SELECTOR, "input[placeholder*='location' i]")), 5)
+                    locations = self.filters['location']
+                    for location in locations if isinstance(locations, list) else [locations]:
+                        location_input.clear()
+                        location_input.send_keys(location)
+                        # Wait for the suggestion list so ENTER picks a real location
+                        self.waiter.try_wait_for('location_suggestions', EC.presence_of_element_located((By.CSS_SELECTOR, "[role='option']")), 5)
+                        location_input.send_keys(Keys.ENTER)
                     print("Location filter applied")
                     
                 except Exception as e:
@@ -237,201 +553,432 @@ class ApolloScraper:
             print(f"Current URL after filters: {self.driver.current_url}")
             
             # Wait for results to update
-            time.sleep(3)
+            if self.waiter.try_wait_for_new_rows(marker_before_filters, 'filter_results') is None:
+                print("Results did not change after applying filters (they may already have been applied)")
             
         except Exception as e:
             print(f"Error applying filters: {e}")
             print("Continuing with default search...")
+
+    def _wait_for_filter_selected(self, option_element):
+        '''Wait until a clicked filter option shows its remove icon, i.e. the filter took effect.'''
+        self.waiter.try_wait_for(
+            'filter_click',
+            lambda driver: option_element.find_elements(By.CSS_SELECTOR, 'i.apollo-icon-times'),
+            5,
+        )
             
     def get_text_or_default(self, element, default=''):
         '''Helper function to extract text from an element or return default if None.'''
         return element.text.strip() if element else default
 
-    def scrape_data(self, num_pages_to_scrape, excel_file_path):
-        '''Scrape data from the Apollo website (handles both people and list pages).'''
+    def scrape_data(self, num_pages_to_scrape, sink, start_page=1):
+        '''Scrape data from the Apollo website (handles both people and list pages) into an output sink.
+
+        Returns the number of pages scraped.
+        '''
         
-        if self.page_type == 'people':
-            self._scrape_people_data(num_pages_to_scrape, excel_file_path)
-        elif self.page_type == 'list':
-            self._scrape_list_data(num_pages_to_scrape, excel_file_path)
-        else:
+        if self.page_type not in ('people', 'list'):
             print("Unknown page type. Cannot scrape.")
+            return 0
+
+        pages_saved = 0
+        for batch in self.iter_pages(num_pages_to_scrape, start_page):
+            self._write_batch(batch, sink)
+            pages_saved += 1
+            print(f"Saved {len(batch)} rows from result page {batch.page}")
+        return pages_saved
+
+    def iter_pages(self, num_pages_to_scrape, start_page=1):
+        '''Yield one RecordBatch per scraped people or list page, as soon as the page is parsed.
+
+        Rows already in the dedup index are left out. The browser only moves on when the consumer
+        asks for the next page, which is also when the previous page is checkpointed and its rows
+        are committed to the dedup index.
+        '''
+        if self.page_type not in ('people', 'list'):
+            print(f"Cannot scrape page type '{self.page_type}'.")
+            return
+        yield from self._iter_result_pages(num_pages_to_scrape, start_page)
+
+    async def aiter_pages(self, num_pages_to_scrape, start_page=1):
+        '''Async iterator over iter_pages() for asyncio consumers.
+
+        The blocking browser work runs in a worker thread. As with iter_pages(), the browser only moves
+        on, and a page is only checkpointed and committed to the dedup index, once the body of the
+        consumer's `async for` has finished with it. If the body raises or breaks, that page is left
+        uncommitted and no further page is loaded.
+        '''
+        loop = asyncio.get_running_loop()
+        # Holds at most one item: the worker waits for each batch to be acknowledged before going on
+        batches = asyncio.Queue()
+        # True once the consumer has handled a batch, False when it stopped iterating
+        acks = queue.Queue()
+        done = object()
+
+        def produce():
+            pages = self.iter_pages(num_pages_to_scrape, start_page)
+            try:
+                for batch in pages:
+                    asyncio.run_coroutine_threadsafe(batches.put(batch), loop).result()
+                    if not acks.get():
+                        return
+                item = done
+            except Exception as e:
+                item = e
+            finally:
+                # Closed in the browser's own thread, before the unacknowledged page is committed
+                pages.close()
+            asyncio.run_coroutine_threadsafe(batches.put(item), loop).result()
+
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await batches.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+                acks.put(True)
+        finally:
+            acks.put(False)
+            await producer
+
+    def go_to_page(self, page_number):
+        '''Jump straight to a result page by rewriting the page parameter of the hash route.'''
+        print(f"Jumping to page {page_number}...")
+        marker = self.waiter.page_marker()
+        self.driver.get(set_hash_param(self.driver.current_url, 'page', page_number))
+        self.waiter.wait_for_new_rows(marker, 'jump_to_page', 30)
     
-    def _scrape_people_data(self, num_pages_to_scrape, excel_file_path):
-        '''Scrape data from a people search page.'''
+    def _iter_result_pages(self, num_pages_to_scrape, start_page=1):
+        '''Scrape a people search or saved list page by page, starting at start_page, and yield each page's new rows.
+
+        With a checkpoint journal, an interrupted crawl resumes after its last completed page.
+        '''
+        start = self._start_scrape(num_pages_to_scrape, start_page)
+        if start is None:
+            return
+        job_key, pages_done, total_rows, first_page, num_pages_remaining = start
         page_num = 0
+        pages_saved = 0
+        finished = num_pages_remaining <= 0
+
+        while page_num < num_pages_remaining:
+            page_num += 1
+            result_page = first_page + page_num - 1
+            print(f'Scraping page {page_num}/{num_pages_remaining} (result page {result_page})...')
+            
+            with self.metrics.profile(page_num), self.metrics.span('page', page=result_page):
+                rows = self._recovering(self._extract_page_rows, result_page)
+
+            if not self._check_page_rows(rows):
+                break
+
+            print(f"Found {len(rows)} rows on page {page_num}")
+            yield self._new_records(rows, result_page)
+
+            # The consumer has handled the page once it asks for the next one
+            if self.dedup_index is not None:
+                self.dedup_index.commit()
+            pages_saved += 1
+            self.metrics.incr('pages_scraped')
+            total_rows += len(rows)
+            if self.checkpoint is not None:
+                self.checkpoint.record_page(job_key, self.filters, result_page, pages_done + pages_saved,
+                                            len(rows), total_rows, self.waiter.page_marker())
+
+            if page_num < num_pages_remaining:
+                outcome = self._move_to_next_page(result_page)
+                if outcome != 'next':
+                    finished = outcome == 'end'
+                    break
+            else:
+                print(f"Reached the maximum specified number of pages: {num_pages_to_scrape}")
+                finished = True
+
+        if finished and self.checkpoint is not None:
+            self.checkpoint.mark_complete(job_key, pages_done + pages_saved, total_rows)
+
+        self.metrics.print_summary()
+
+    def _start_scrape(self, num_pages_to_scrape, start_page=1):
+        '''Resume from the checkpoint, confirm the table has rows and jump to the first page still to scrape.
+
+        Returns (job_key, pages_done, total_rows, first_page, num_pages_remaining), or None if there is nothing to scrape.
+        '''
+        pages_done = 0
+        total_rows = 0
+        job_key = crawl_key(self.base_url, self.filters, start_page, self.job_id)
         
-        print("Starting to scrape PEOPLE data! :)")
+        print(f"Starting to scrape {self.page_type.upper()} data! :)")
+
+        if self.checkpoint is not None:
+            state = self.checkpoint.resume_point(job_key)
+            if state:
+                pages_done = state['pages_done']
+                total_rows = state['total_rows']
+                print(f"Resuming from checkpoint: {pages_done} pages ({total_rows} rows) already done, "
+                      f"last completed result page {state['page']}")
         
         # Wait for data rows
-        data_wait = WebDriverWait(self.driver, 15)
         try:
-            print("Confirming presence of people data rows...")
-            data_wait.until(EC.presence_of_element_located(
-                (By.CSS_SELECTOR, f'{PEOPLE_TABLE_BODY_SELECTOR} {PEOPLE_ROW_SELECTOR}')
-            ))
+            print("Confirming presence of data rows...")
+            self.waiter.wait_for('data_rows', EC.presence_of_element_located(
+                (By.CSS_SELECTOR, f'{self.parser.table_body_selector} {PEOPLE_ROW_SELECTOR}')
+            ), 15)
             print("Data rows confirmed!")
         except TimeoutException:
-            print("No people data rows appeared. The search may be empty.")
+            print("No data rows appeared. The search or list may be empty.")
             
             # Debug: Save screenshot and page source
             self.driver.save_screenshot("no_data_rows.png")
             with open("no_data_page_source.html", "w", encoding="utf-8") as f:
                 f.write(self.driver.page_source)
             print("Saved debug files: no_data_rows.png and no_data_page_source.html")
+            return None
+
+        num_pages_remaining = num_pages_to_scrape - pages_done
+        first_page = start_page + pages_done
+        if num_pages_remaining <= 0:
+            print(f"Checkpoint shows all {num_pages_to_scrape} pages are already done.")
+        elif first_page > 1:
+            try:
+                self.go_to_page(first_page)
+            except TimeoutException:
+                print(f"Could not reach page {first_page}. The search may have fewer pages.")
+                return None
+        return job_key, pages_done, total_rows, first_page, num_pages_remaining
+
+    def _check_page_rows(self, rows, challenged=None):
+        '''Return True if a parsed page has rows; otherwise report why the scrape has to end.
+
+        challenged says whether a challenge covered the page when it was fetched; if None, the browser
+        is asked now, so callers on other threads than the browser's must pass it.
+        '''
+        if rows is None:
+            print("Could not find people table body!")
+            self.metrics.incr('page_failures', reason='no_table')
+            return False
+        if not rows:
+            print("No data rows found on the current page. Ending scrape.")
+            self.metrics.incr('page_failures', reason='no_rows')
+            if challenged is None:
+                challenged = self._challenge_showing()
+            self._report_trouble('challenge' if challenged else 'empty_table')
+            return False
+        return True
+
+    def _pace(self):
+        '''Wait before loading a page: for the rate governor's token if there is one, else the politeness delay.'''
+        if self.rate_governor is None:
+            self.waiter.polite_pause()
             return
+        with self.metrics.span('rate_wait'):
+            self.rate_governor.acquire()
 
-        while page_num < num_pages_to_scrape:
-            page_num += 1
-            print(f'Scraping page {page_num}/{num_pages_to_scrape}...')
+    def _report_trouble(self, reason):
+        self.metrics.incr('rate_backoffs', reason=reason)
+        if self.rate_governor is not None:
+            self.rate_governor.report_trouble(reason)
+
+    def _challenge_showing(self):
+        '''True if Cloudflare's challenge modal is covering the page.'''
+        try:
+            return any(modal.is_displayed() for modal in self.driver.find_elements(By.XPATH, CF_MODAL_XPATH))
+        except WebDriverException:
+            return False
+
+    def _move_to_next_page(self, result_page):
+        '''Go on to the next result page, in a fresh browser if the browser pool says this one is due.
+
+        Returns 'next', 'end' or 'timeout' like _go_to_next_page().
+        '''
+        pool = self.browser_pool
+        if pool is not None:
+            pool.page_done(self)
+            reason = pool.needs_recycle(self)
+            if reason:
+                if not self._next_page_exists():
+                    return 'end'
+                return 'next' if pool.restart(self, result_page + 1, reason) else 'timeout'
+        try:
+            return self._go_to_next_page(result_page)
+        except WebDriverException as e:
+            if not self._recover_browser(e, result_page + 1):
+                raise
+            return 'next'
+
+    def _next_page_exists(self):
+        try:
+            next_button = self.driver.find_element(By.CSS_SELECTOR, NEXT_PAGE_BUTTON_CSS)
+        except NoSuchElementException:
+            return False
+        except WebDriverException:
+            # The browser is being replaced anyway; let the fresh one find out
+            return True
+        return 'true' not in (next_button.get_attribute('aria-disabled') or '')
+
+    def _recovering(self, step, resume_page):
+        '''Run a browser step; if the browser died, restart it at resume_page and run the step once more.'''
+        try:
+            return step()
+        except WebDriverException as e:
+            if not self._recover_browser(e, resume_page):
+                raise
+            return step()
+
+    def _recover_browser(self, error, resume_page):
+        '''Restart a dead browser through the pool. Returns False if there is no pool or the browser is alive.'''
+        if self.browser_pool is None or self.browser_pool.is_alive(self):
+            return False
+        print(f"Browser died ({error.msg}), restarting it at result page {resume_page}")
+        return self.browser_pool.restart(self, resume_page, 'crashed')
+
+    def _go_to_next_page(self, result_page):
+        '''Click Next and wait for the new rows.
+
+        Returns 'next' once they are shown, 'end' at the last page of results, or 'timeout'.
+        '''
+        try:
+            next_button = self.driver.find_element(By.CSS_SELECTOR, NEXT_PAGE_BUTTON_CSS)
+            if 'true' in (next_button.get_attribute('aria-disabled') or ''):
+                print("Next page button is disabled. Reached end of results.")
+                return 'end'
             
-            if page_num > 1:
-                time.sleep(random.uniform(3, 5))
-
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-
-            page_data = {
-                'First Name': [],
-                'Last Name': [],
-                'Job Title': [],
-                'Business Name': [],
-                'Personal email': [],
-                'Phone number': [],
-                'Personal LinkedIn': [],
-                'Company LinkedIn': [],
-                'Country': [],
-                'Niche': [],
-                'Employee Count': []
-            }
-
-            table_body = soup.select_one(PEOPLE_TABLE_BODY_SELECTOR)
-            if not table_body:
-                print("Could not find people table body!")
-                break
-                
-            data_rows = table_body.select(PEOPLE_ROW_SELECTOR)
+            self._pace()
+            with self.metrics.span('navigate', page=result_page + 1):
+                marker_before_click = self.waiter.page_marker()
+                clicked = time.perf_counter()
+                next_button.click()
+                print("Navigating to next page...")
+                self.waiter.wait_for_new_rows(marker_before_click)
+            if self.rate_governor is not None:
+                self.rate_governor.report_success(time.perf_counter() - clicked)
+            return 'next'
             
-            if not data_rows:
-                print("No data rows found on the current page. Ending scrape.")
-                break
+        except NoSuchElementException:
+            print("No next page button found. Reached end of pagination.")
+            return 'end'
+        except TimeoutException:
+            print("Next page did not render new rows in time. Ending scrape.")
+            self.metrics.incr('page_failures', reason='navigation_timeout')
+            self._report_trouble('challenge' if self._challenge_showing() else 'timeout')
+            return 'timeout'
 
-            print(f"Found {len(data_rows)} rows on page {page_num}")
+    def _extract_page_rows(self):
+        '''Pull the current page's rows out of the browser and count row errors and missing fields.'''
+        mode, payload = self._fetch_page_snapshot()
+        with self.metrics.span('parse', mode=mode):
+            rows, row_errors = parse_snapshot(mode, payload, self.parser, self.script_parser)
+        self._count_row_problems(rows, row_errors)
+        return rows
 
-            for idx, row in enumerate(data_rows):
-                try:
-                    # 1. Name (column 1)
-                    name_element = row.select_one('div[aria-colindex="1"] a')
-                    full_name = self.get_text_or_default(name_element, 'N/A')
-                    
-                    if '------' in full_name:
-                        full_name = full_name.split('------')[0].strip()
-                    
-                    parts = full_name.split(maxsplit=1)
-                    page_data['First Name'].append(parts[0] if parts and parts[0] != 'N/A' else 'N/A')
-                    page_data['Last Name'].append(parts[1] if len(parts) > 1 else 'N/A')
+    def _count_row_problems(self, rows, row_errors):
+        if row_errors:
+            self.metrics.incr('row_errors', row_errors)
+        if rows:
+            self.metrics.count_na_fields(rows)
 
-                    # 2. Job Title (column 2)
-                    job_title_element = row.select_one('div[aria-colindex="2"] span.zp_FEm_X')
-                    page_data['Job Title'].append(self.get_text_or_default(job_title_element, 'N/A'))
+    def _fetch_page_snapshot(self):
+        '''Pull the current page out of the browser with the configured mode, falling back to page_source.
 
-                    # 3. Company Name (column 3)
-                    company_name_element = row.select_one('div[aria-colindex="3"] span.zp_xvo3G')
-                    page_data['Business Name'].append(self.get_text_or_default(company_name_element, 'N/A'))
-                    
-                    # 4. Email (column 4)
-                    email_button = row.select_one('div[aria-colindex="4"] button')
-                    if email_button and 'Access email' in email_button.text:
-                        page_data['Personal email'].append('Requires Access')
-                    else:
-                        page_data['Personal email'].append('N/A')
-                    
-                    # 5. Phone Number (column 5)
-                    phone_button = row.select_one('div[aria-colindex="5"] button')
-                    if phone_button and 'Access Mobile' in phone_button.text:
-                        page_data['Phone number'].append('Requires Access')
-                    else:
-                        page_data['Phone number'].append('N/A')
-
-                    # 6. LinkedIn (column 7)
-                    linkedin_link = row.select_one('div[aria-colindex="7"] a[href*="linkedin.com/in"]')
-                    if linkedin_link:
-                        page_data['Personal LinkedIn'].append(linkedin_link.get('href', 'N/A'))
-                    else:
-                        page_data['Personal LinkedIn'].append('N/A')
-                    
-                    page_data['Company LinkedIn'].append('N/A')
+        Returns (mode, payload) for parse_snapshot(); the payload is HTML, script rows or an API response.
+        '''
+        mode = self.extraction_mode
+        try:
+            if mode == 'api':
+                with self.metrics.span('transfer', mode=mode):
+                    traffic = capture_search_traffic(self.driver, self.api_fixture_dir)
+                if traffic:
+                    return mode, traffic[-1]['response']
+                print("No search API response captured for this page, falling back to page_source")
+            elif mode == 'script':
+                with self.metrics.span('transfer', mode=mode):
+                    raw_rows = self.driver.execute_script(ROW_FIELDS_JS, *self.script_parser.script_args())
+                if raw_rows is not None:
+                    return mode, raw_rows
+            elif mode == 'rowgroup':
+                with self.metrics.span('transfer', mode=mode):
+                    html = self.driver.execute_script(ROWGROUP_HTML_JS, self.parser.table_body_selector)
+                if html:
+                    return mode, html
+        except WebDriverException as e:
+            print(f"'{mode}' extraction failed ({e.msg}), falling back to page_source")
 
-                    # 7. Location (column 9)
-                    location_element = row.select_one('div[aria-colindex="9"] button span.zp_FEm_X')
-                    page_data['Country'].append(self.get_text_or_default(location_element, 'N/A'))
+        if mode != 'page_source':
+            self.metrics.incr('extraction_fallbacks', mode=mode)
+        with self.metrics.span('transfer', mode='page_source'):
+            return 'page_source', self.driver.page_source
 
-                    # 8. Employee Count (column 10)
-                    employee_count_element = row.select_one('div[aria-colindex="10"] span.zp_Vnh4L')
-                    page_data['Employee Count'].append(self.get_text_or_default(employee_count_element, 'N/A'))
-                    
-                    # 9. Industries and Keywords
-                    industries_elements = row.select('div[aria-colindex="11"] span.zp_z4aAi')
-                    keywords_elements = row.select('div[aria-colindex="12"] span.zp_z4aAi')
-                    
-                    all_niches = [self.get_text_or_default(el) for el in industries_elements + keywords_elements]
-                    all_niches = [n for n in all_niches if not n.startswith('+') and n != 'N/A']
-                    page_data['Niche'].append(", ".join(all_niches) if all_niches else 'N/A')
-                    
-                except Exception as e:
-                    print(f"Error processing row {idx}: {e}")
-                    for key in page_data.keys():
-                        if len(page_data[key]) <= idx:
-                            page_data[key].append('N/A')
+    def scrape_via_api(self, num_pages_to_scrape, sink, per_page=100):
+        '''Replay the current search through the JSON API with the browser's session, skipping rendering entirely.
 
-            df = pd.DataFrame(page_data)
-            self.save_to_excel(df, excel_file_path)
-            print(f"Saved {len(df)} rows from page {page_num}")
+        Needs extraction_mode='api' so the search request Apollo sent can be read back. Returns pages saved.
+        '''
+        traffic = capture_search_traffic(self.driver, self.api_fixture_dir)
+        payloads = [item['request'] for item in traffic if item['request']]
+        if not payloads:
+            print("No search request captured to replay. Is the scraper running with extraction_mode='api'?")
+            return 0
 
-            if page_num < num_pages_to_scrape:
-                try:
-                    next_button = self.driver.find_element(By.CSS_SELECTOR, NEXT_PAGE_BUTTON_CSS)
-                    if 'true' in next_button.get_attribute('aria-disabled'):
-                        print("Next page button is disabled. Reached end of results.")
-                        break
-                    
-                    next_button.click()
-                    print("Navigating to next page...")
-                    time.sleep(2)
-                    
-                except NoSuchElementException:
-                    print("No next page button found. Reached end of pagination.")
-                    break
-            else:
-                print(f"Reached the maximum specified number of pages: {num_pages_to_scrape}")
+        client = ApolloApiClient.from_driver(self.driver)
+        pages_saved = 0
+        try:
+            for rows in client.iter_pages(payloads[-1], max_pages=num_pages_to_scrape, per_page=per_page):
+                pages_saved += 1
+                self.save_page(rows, sink)
+                print(f"Saved {len(rows)} rows from API page {pages_saved}")
+        except requests.RequestException as e:
+            print(f"API replay stopped: {e}")
+        finally:
+            client.close()
+        return pages_saved
 
-    def _scrape_list_data(self, num_pages_to_scrape, excel_file_path):
-        '''Scrape data from a list page (keeping original implementation).'''
-        # [Keep your original list scraping code here - I'll omit for brevity]
-        pass
-
-    def save_to_excel(self, df, excel_file_path):
-        '''Save the scraped data to an Excel file. If file exists, it appends new data.'''
-        if os.path.isfile(excel_file_path):
-            existing_df = pd.read_excel(excel_file_path)
-            df_no_duplicates = pd.concat([existing_df, df]).drop_duplicates(keep='first', ignore_index=True)
-            df_no_duplicates.to_excel(excel_file_path, index=False)
-        else:
-            df.to_excel(excel_file_path, index=False)
-        print(f"Data saved to {excel_file_path}")
+    def save_page(self, records, sink):
+        '''Append one page of PersonRecords to the output sink. Cost depends only on the size of the page.'''
+        self._write_batch(self._new_records(records), sink)
+
+    def _new_records(self, records, page=None):
+        '''Batch the records that are not in the dedup index yet, marking them as seen (uncommitted).'''
+        if self.dedup_index is not None:
+            new_records = self.dedup_index.filter_new(records)
+            if len(new_records) < len(records):
+                print(f"Skipped {len(records) - len(new_records)} rows already in the dedup index")
+                self.metrics.incr('rows_duplicate', len(records) - len(new_records))
+            records = new_records
+        return RecordBatch(records, page)
 
-    def remove_duplicates(self, input_file, output_file):
-        '''Remove duplicate entries in the Excel file and save the cleaned data.'''
-        if not os.path.exists(input_file):
-            print(f"Cannot remove duplicates: Input file '{input_file}' not found.")
+    def _write_batch(self, batch, sink):
+        '''Persist a batch and commit its rows to the dedup index.'''
+        with self.metrics.span('save'):
+            sink.write(batch)
+            if self.dedup_index is not None:
+                self.dedup_index.commit()
+        self.metrics.incr('rows_saved', len(batch))
+        print(f"Data saved to {sink.path}")
+
+    def remove_duplicates(self, sink, output_file):
+        '''Remove duplicate entries from the sink and export the cleaned data to Excel.'''
+        if not sink.exists():
+            print(f"Cannot remove duplicates: Sink '{sink.path}' has no data.")
             return
 
-        df = pd.read_excel(input_file)
-        if df.duplicated().any():
-            df_no_duplicates = df.drop_duplicates(keep='first')
-            df_no_duplicates.to_excel(output_file, index=False)
-            print(f"Duplicate rows removed and saved to {output_file}")
+        seen = set()
+        unique_rows = []
+        total = 0
+        for row in sink.iter_rows():
+            total += 1
+            key = identity_key(row) or tuple(row.values())
+            if key not in seen:
+                seen.add(key)
+                unique_rows.append(row)
+
+        sink.export_excel(output_file, unique_rows)
+        if total > len(unique_rows):
+            print(f"{total - len(unique_rows)} duplicate rows removed and saved to {output_file}")
         else:
-            df.to_excel(output_file, index=False)
             print("No duplicate rows found. Data remains unchanged.")
 
     def quit(self):
@@ -448,18 +995,43 @@ class ApolloScraper:
 if __name__ == "__main__":
     user_agents = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36"]
 
-    scraper = ApolloScraper(user_agents, BASE_URL, FILTERS)
-
-    scraper.login()
+    dedup_index = DedupIndex('seen_people.db')
+    checkpoint = CheckpointJournal('crawl_checkpoint.jsonl')
+    session_cache = SessionCache('sessions')
+    filter_plans = FilterPlanCache('filter_plans.json')
+    rate_governor = RateGovernor(RATE_GOVERNOR_DB, EMAIL) if RATE_GOVERNOR_DB else None
+    browser_pool = BrowserPool(
+        lambda: ApolloScraper(user_agents, BASE_URL, FILTERS, dedup_index=dedup_index, checkpoint=checkpoint,
+                              session_cache=session_cache, filter_plans=filter_plans, rate_governor=rate_governor),
+        max_pages=BROWSER_MAX_PAGES, max_rss_mb=BROWSER_MAX_RSS_MB,
+    )
+    # Logs in; later restarts reuse the cached session
+    scraper = browser_pool.acquire()
 
     num_pages_to_scrape = 2  
+    result_count = scraper._read_result_count()
+    if result_count is not None and result_count > APOLLO_MAX_PAGES * PEOPLE_PAGE_SIZE:
+        print(f"The search has {result_count} results but Apollo only pages through "
+              f"{APOLLO_MAX_PAGES * PEOPLE_PAGE_SIZE}; run query_planner.py to split it")
+    sink_path = 'data.csv'  # .csv, .jsonl, .parquet or .db
     excel_file_path = 'data.xlsx'
-    scraper.scrape_data(num_pages_to_scrape, excel_file_path)
+    sink = open_sink(sink_path)
+    if PARSE_WORKERS:
+        ScrapePipeline(scraper, sink, parse_workers=PARSE_WORKERS).run(num_pages_to_scrape)
+    else:
+        scraper.scrape_data(num_pages_to_scrape, sink)
 
-    scraper.quit()
+    browser_pool.close()
+    scraper.metrics.export_jsonl('metrics.jsonl')
+    scraper.metrics.export_prometheus('metrics.prom')
 
     output_file_path = "cleaned_data.xlsx"
-    if os.path.exists(excel_file_path):
-        scraper.remove_duplicates(excel_file_path, output_file_path)
+    if sink.exists():
+        sink.export_excel(excel_file_path)
+        scraper.remove_duplicates(sink, output_file_path)
     else:
-        print("Skipping duplicate removal as no data file was created.")
\ No newline at end of file
+        print("Skipping export and duplicate removal as no data was written.")
+    sink.close()
+    dedup_index.close()
+    if rate_governor is not None:
+        rate_governor.close()
@@ -0,0 +1,174 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+METRIC_PREFIX = 'apollo_scraper'
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _prom_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+class Metrics:
+    '''Timing spans and counters for one scraper run, exportable as JSON Lines and Prometheus text.
+
+    Spans are recorded per stage (login, filters, transfer, parse, save, navigate, ...) with
+    optional labels such as the page number. Set profile_page to run a profiler around one page.
+    '''
+
+    def __init__(self, run_id=None, profile_page=None, profiler='cprofile', profile_dir='profiles'):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.profile_page = profile_page
+        self.profiler = profiler
+        self.profile_dir = profile_dir
+        self.spans = []
+        self.counters = defaultdict(float)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, stage, **labels):
+        '''Time the enclosed block as one occurrence of stage.'''
+        started_at = time.time()
+        started = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.spans.append({
+                'stage': stage,
+                'seconds': time.perf_counter() - started,
+                'started_at': started_at,
+                'ok': ok,
+                'labels': labels,
+            })
+
+    def observe(self, stage, seconds, ok=True, **labels):
+        '''Record a span that was timed elsewhere (e.g. by PageWaiter).'''
+        self.spans.append({'stage': stage, 'seconds': seconds, 'started_at': time.time() - seconds, 'ok': ok, 'labels': labels})
+
+    def incr(self, name, value=1, **labels):
+        # Counters are bumped from both the browser and writer threads of a ScrapePipeline
+        with self._lock:
+            self.counters[(name, _label_key(labels))] += value
+
+    def count_na_fields(self, records):
+        '''Count missing (None) values per PersonRecord field, which is the first sign of a selector that stopped matching.'''
+        for record in records:
+            for field, value in zip(record._fields, record):
+                if value is None:
+                    self.incr('na_fields', field=field)
+
+    def stage_summary(self):
+        '''Aggregate spans per stage: count, total, mean and max seconds, and failures.'''
+        stats = {}
+        for span in self.spans:
+            entry = stats.setdefault(span['stage'], {'count': 0, 'total': 0.0, 'max': 0.0, 'failures': 0})
+            entry['count'] += 1
+            entry['total'] += span['seconds']
+            entry['max'] = max(entry['max'], span['seconds'])
+            entry['failures'] += 0 if span['ok'] else 1
+        for entry in stats.values():
+            entry['mean'] = entry['total'] / entry['count']
+        return stats
+
+    def print_summary(self):
+        print(f"Stage timings for run {self.run_id} (seconds):")
+        for stage, entry in sorted(self.stage_summary().items(), key=lambda item: -item[1]['total']):
+            print(f"  {stage}: n={entry['count']} mean={entry['mean']:.3f} max={entry['max']:.3f} "
+                  f"total={entry['total']:.2f} failures={entry['failures']}")
+        for (name, labels), value in sorted(self.counters.items()):
+            print(f"  {name}{_prom_labels(labels)} = {value:g}")
+
+    def export_jsonl(self, path):
+        '''Append every span and the final counter values to a JSON Lines file.'''
+        with open(path, 'a', encoding='utf-8') as f:
+            for span in self.spans:
+                f.write(json.dumps({'type': 'span', 'run_id': self.run_id, **span}) + '\n')
+            for (name, labels), value in self.counters.items():
+                f.write(json.dumps({'type': 'counter', 'run_id': self.run_id, 'name': name,
+                                    'labels': dict(labels), 'value': value}) + '\n')
+        print(f"Metrics written to {path}")
+
+    def export_prometheus(self, path):
+        '''Write a Prometheus text-format file, e.g. for node_exporter's textfile collector.'''
+        lines = [
+            f'# HELP {METRIC_PREFIX}_stage_seconds Time spent per scraper stage.',
+            f'# TYPE {METRIC_PREFIX}_stage_seconds summary',
+        ]
+        for stage, entry in sorted(self.stage_summary().items()):
+            labels = _prom_labels((('run_id', self.run_id), ('stage', stage)))
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_sum{labels} {entry["total"]:.6f}')
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_count{labels} {entry["count"]}')
+        lines.append(f'# TYPE {METRIC_PREFIX}_stage_seconds_max gauge')
+        for stage, entry in sorted(self.stage_summary().items()):
+            labels = _prom_labels((('run_id', self.run_id), ('stage', stage)))
+            lines.append(f'{METRIC_PREFIX}_stage_seconds_max{labels} {entry["max"]:.6f}')
+
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f'{METRIC_PREFIX}_{name}_total'
+            if metric not in typed:
+                lines.append(f'# TYPE {metric} counter')
+                typed.add(metric)
+            lines.append(f'{metric}{_prom_labels((("run_id", self.run_id),) + labels)} {value:g}')
+
+        # Write-then-rename so a collector never reads a half-written file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, path)
+        print(f"Prometheus metrics written to {path}")
+
+    @contextmanager
+    def profile(self, page_num):
+        '''Profile the enclosed block if page_num is the page selected with profile_page.'''
+        if page_num != self.profile_page:
+            yield
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base_path = os.path.join(self.profile_dir, f"{self.run_id}-page-{page_num}")
+        if self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{base_path}.html", 'w', encoding='utf-8') as f:
+                    f.write(profiler.output_html())
+                print(f"Saved pyinstrument profile of page {page_num} to {base_path}.html")
+            return
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(f"{base_path}.prof")
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(15)
+            print(f"Saved cProfile stats of page {page_num} to {base_path}.prof")
+            print(report.getvalue())
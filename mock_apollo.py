@@ -0,0 +1,287 @@
+'''Local stand-in for Apollo's login and people search, for exercising ApolloScraper end to end.
+
+    python mock_apollo.py --port 8765 --people 5000 --latency 0.3 --challenge-every 20
+
+Point the scraper at it with ApolloScraper(..., base_url=f"{url}#/people", app_url=url). The page
+follows the DOM contract the scraper relies on: a login form, #main-app, a zp_XgaPk rowgroup of
+rows with aria-rowindex and aria-colindex cells, a Next button with aria-disabled, the
+"1 - 25 of N" pagination label and a zp-modal-mask challenge overlay. Any email and password log in.
+'''
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from query_planner import EMPLOYEE_RANGES, LOCATION_PARTS, SENIORITY_VALUES
+
+FIRST_NAMES = ['Ada', 'Ben', 'Chloe', 'Dev', 'Elena', 'Farid', 'Grace', 'Hiro', 'Ines', 'Jamal', 'Kofi', 'Lena',
+               'Mateo', 'Nora', 'Omar', 'Priya', 'Quinn', 'Rosa', 'Sam', 'Tara', 'Uma', 'Victor', 'Wei', 'Yara']
+LAST_NAMES = ['Adams', 'Baker', 'Chen', 'Diaz', 'Evans', 'Fischer', 'Garcia', 'Haddad', 'Ivanova', 'Jones', 'Kim',
+              'Lopez', 'Mensah', 'Novak', 'Okafor', 'Patel', 'Rossi', 'Singh', 'Tanaka', 'Walker']
+COMPANY_WORDS = ['Acme', 'Blue', 'Cedar', 'Delta', 'Ember', 'Flux', 'Granite', 'Harbor', 'Iris', 'Juniper', 'Kite',
+                 'Lumen', 'Maple', 'Nimbus', 'Orbit', 'Pine', 'Quartz', 'River', 'Summit', 'Tidal']
+INDUSTRIES = ['Information Technology & Services', 'Computer Software', 'Marketing & Advertising', 'Financial Services',
+              'Hospital & Health Care', 'Construction', 'Retail', 'Real Estate', 'Education Management']
+KEYWORDS = ['saas', 'b2b', 'analytics', 'ecommerce', 'logistics', 'fintech', 'consulting', 'manufacturing', 'cloud']
+SENIORITY_TITLES = {'owner': 'Owner', 'founder': 'Founder', 'c_suite': 'CEO', 'partner': 'Partner',
+                    'vp': 'VP of Sales', 'head': 'Head of Marketing', 'director': 'Director of Operations',
+                    'manager': 'Engineering Manager', 'senior': 'Senior Accountant', 'entry': 'Sales Associate',
+                    'intern': 'Marketing Intern', None: 'Consultant'}
+EMAIL_STATUSES = ['verified', 'likely_to_engage', 'unavailable']
+
+APP_HTML = '''<!doctype html>
+<html><head><meta charset="utf-8"><title>Apollo (mock)</title>
+<style>.zp-modal-mask{position:fixed;inset:0;background:rgba(0,0,0,.4)} [role=row]{display:flex;gap:8px}</style>
+</head><body><div id="root"></div><script>
+const root = document.getElementById('root');
+let requestId = 0;
+
+function loggedIn() { return document.cookie.includes('mock_session=1'); }
+function hashQuery() { const i = location.hash.indexOf('?'); return i < 0 ? '' : location.hash.slice(i + 1); }
+
+function renderLogin() {
+  root.innerHTML = '<form><input name="email"><input name="password" type="password">' +
+                   '<button type="button">Log In</button></form>';
+  root.querySelector('button').onclick = () => {
+    document.cookie = 'mock_session=1; path=/';
+    if (location.hash.startsWith('#/people')) render(); else location.hash = '#/people';
+  };
+}
+
+function render() {
+  if (!loggedIn()) { renderLogin(); return; }
+  if (!document.getElementById('main-app')) {
+    root.innerHTML = '<div id="main-app"><div class="zp_XgaPk" role="rowgroup"></div>' +
+      '<div class="zp_j49HX"><button aria-label="Previous" aria-disabled="true">&lt;</button>' +
+      '<button aria-label="Next" aria-disabled="true">&gt;</button><div class="zp_tMpqI"></div></div></div>';
+    document.querySelector('button[aria-label="Next"]').onclick = nextPage;
+  }
+  load();
+}
+
+async function load() {
+  const id = ++requestId;
+  const response = await fetch('/api/people?' + hashQuery());
+  const data = await response.json();
+  if (id !== requestId) return;
+  if (data.challenge) { showChallenge(data.challenge, id); return; }
+  document.querySelector('[role="rowgroup"]').innerHTML = data.rows;
+  document.querySelector('.zp_tMpqI').textContent = data.label;
+  document.querySelector('button[aria-label="Next"]').setAttribute('aria-disabled', String(data.page >= data.last_page));
+  document.querySelector('button[aria-label="Previous"]').setAttribute('aria-disabled', String(data.page <= 1));
+}
+
+function showChallenge(seconds, id) {
+  const mask = document.createElement('div');
+  mask.className = 'zp-modal-mask';
+  mask.textContent = 'Verifying you are human...';
+  document.body.appendChild(mask);
+  setTimeout(() => { mask.remove(); if (id === requestId) load(); }, seconds * 1000);
+}
+
+function nextPage() {
+  if (this.getAttribute('aria-disabled') === 'true') return;
+  const params = new URLSearchParams(hashQuery());
+  params.set('page', String(Number(params.get('page') || 1) + 1));
+  location.hash = '#/people?' + params.toString();
+}
+
+window.addEventListener('hashchange', render);
+render();
+</script></body></html>
+'''
+
+
+def make_people(count, seed=0):
+    '''Deterministic synthetic people, spread over seniorities, company sizes and US states.'''
+    rng = random.Random(seed)
+    states = LOCATION_PARTS['United States']
+    people = []
+    for index in range(count):
+        seniority = rng.choice(SENIORITY_VALUES + [None])
+        low, high = rng.choice(EMPLOYEE_RANGES)
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        company = f"{rng.choice(COMPANY_WORDS)} {rng.choice(COMPANY_WORDS)}"
+        people.append({
+            'id': f"{index:08x}",
+            'name': f"{first} {last}",
+            'title': SENIORITY_TITLES[seniority],
+            'seniority': seniority,
+            'company': company,
+            'email_status': rng.choice(EMAIL_STATUSES),
+            'has_phone': rng.random() < 0.3,
+            'linkedin': f"http://www.linkedin.com/in/{first.lower()}-{last.lower()}-{index}",
+            'state': rng.choice(states).rsplit(', ', 1)[0],
+            'employees': rng.randint(low, high or low * 5),
+            'employee_range': (low, high),
+            'industry': rng.choice(INDUSTRIES),
+            'keywords': rng.sample(KEYWORDS, 2),
+        })
+    return people
+
+
+def _matches(person, query):
+    statuses = query.get('contactEmailStatusV2[]')
+    if statuses and person['email_status'] not in statuses:
+        return False
+    seniorities = query.get('personSeniorities[]')
+    if seniorities and person['seniority'] not in seniorities:
+        return False
+    locations = query.get('personLocations[]')
+    if locations and 'United States' not in locations and f"{person['state']}, US" not in locations:
+        return False
+    ranges = query.get('organizationNumEmployeesRanges[]')
+    if ranges and ','.join('' if v is None else str(v) for v in person['employee_range']) not in ranges:
+        return False
+    keywords = query.get('qKeywords')
+    if keywords and keywords[0].lower() not in f"{person['name']} {person['title']} {person['company']}".lower():
+        return False
+    return True
+
+
+def _cell(colindex, content):
+    return f'<div role="cell"><div role="gridcell" aria-colindex="{colindex}">{content}</div></div>'
+
+
+def row_html(rowindex, person):
+    '''One people table row, with each field where ApolloScraper's selectors look for it.'''
+    e = html.escape
+    if person['email_status'] == 'unavailable':
+        email = '<button type="button">Access email</button>'
+    else:
+        email = f'<span class="zp_xvo3G">{e(person["name"].split()[0].lower())}@example.com</span>'
+    phone = ('<a>Request phone number</a>' if person['has_phone'] else '<button type="button">Access Mobile</button>')
+    cells = [
+        _cell(1, f'<a href="#/contacts/{person["id"]}"><span>{e(person["name"])}</span></a>'),
+        _cell(2, f'<span><span class="zp_FEm_X">{e(person["title"])}</span></span>'),
+        _cell(3, f'<a href="#/accounts/{person["id"]}"><span class="zp_xvo3G">{e(person["company"])}</span></a>'),
+        _cell(4, email),
+        _cell(5, phone),
+        _cell(7, f'<a href="{e(person["linkedin"])}">in</a>'),
+        _cell(9, f'<button type="button"><span class="zp_FEm_X">{e(person["state"])}, United States</span></button>'),
+        _cell(10, f'<span class="zp_Vnh4L">{person["employees"]}</span>'),
+        _cell(11, f'<span class="zp_z4aAi">{e(person["industry"])}</span>'),
+        _cell(12, ''.join(f'<span class="zp_z4aAi">{e(k)}</span>' for k in person['keywords'])),
+    ]
+    return f'<div class="zp_Uiy0R" role="row" aria-rowindex="{rowindex}">{"".join(cells)}</div>'
+
+
+class MockApollo:
+    '''Threaded HTTP server serving the mock app and its people search API.
+
+    latency (plus up to jitter) seconds are added to every search request, and every
+    challenge_every-th request shows the challenge overlay for challenge_seconds first.
+    Like Apollo, a search only pages up to max_pages pages of page_size rows.
+    '''
+
+    def __init__(self, people=2500, page_size=25, max_pages=100, latency=0.0, jitter=0.0, challenge_every=0,
+                 challenge_seconds=3, seed=0, host='127.0.0.1', port=0):
+        self.people = make_people(people, seed)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.latency = latency
+        self.jitter = jitter
+        self.challenge_every = challenge_every
+        self.challenge_seconds = challenge_seconds
+        self.requests = 0
+        self.challenges = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def search(self, query):
+        '''JSON payload for one search page request (query as parsed from the hash route).'''
+        with self._lock:
+            self.requests += 1
+            challenge = bool(self.challenge_every) and self.requests % self.challenge_every == 0
+            if challenge:
+                self.challenges += 1
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        if challenge:
+            return {'challenge': self.challenge_seconds}
+
+        matches = [person for person in self.people if _matches(person, query)]
+        last_page = max(1, min(self.max_pages, -(-len(matches) // self.page_size)))
+        page = min(max(1, int(query.get('page', ['1'])[0])), last_page)
+        start = (page - 1) * self.page_size
+        rows = matches[start:start + self.page_size]
+        label = f"{start + 1 if rows else 0} - {start + len(rows)} of {len(matches):,}"
+        return {
+            'page': page,
+            'last_page': last_page,
+            'total': len(matches),
+            'label': label,
+            # aria-rowindex restarts on every page, as on Apollo
+            'rows': ''.join(row_html(index, person) for index, person in enumerate(rows)),
+        }
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == '/api/people':
+                    body = json.dumps(mock.search(parse_qs(parts.query))).encode('utf-8')
+                    content_type = 'application/json'
+                elif parts.path in ('/', '/index.html'):
+                    body = APP_HTML.encode('utf-8')
+                    content_type = 'text/html; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-apollo', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--port', type=int, default=8765)
+    arg_parser.add_argument('--people', type=int, default=2500)
+    arg_parser.add_argument('--latency', type=float, default=0.3)
+    arg_parser.add_argument('--jitter', type=float, default=0.2)
+    arg_parser.add_argument('--challenge-every', type=int, default=0)
+    arg_parser.add_argument('--challenge-seconds', type=float, default=3)
+    args = arg_parser.parse_args()
+
+    mock = MockApollo(people=args.people, latency=args.latency, jitter=args.jitter, challenge_every=args.challenge_every,
+                      challenge_seconds=args.challenge_seconds, port=args.port).start()
+    print(f"Mock Apollo serving {args.people} people at {mock.url}#/people (Ctrl+C to stop)")
+    try:
+        mock._thread.join()
+    except KeyboardInterrupt:
+        mock.stop()
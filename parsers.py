@@ -0,0 +1,318 @@
+from bs4 import BeautifulSoup
+
+from records import Access, PersonRecord
+
+# Selector of each field inside its table cell. People searches and saved lists share the cell markup
+FIELD_CELL_SELECTORS = {
+    'name': 'a',
+    'job_title': 'span.zp_FEm_X',
+    'company_name': 'span.zp_xvo3G',
+    'email_button': 'button',
+    'phone_button': 'button',
+    'linkedin': 'a[href*="linkedin.com/in"]',
+    'location': 'button span.zp_FEm_X',
+    'employee_count': 'span.zp_Vnh4L',
+    'industries': 'span.zp_z4aAi',
+    'keywords': 'span.zp_z4aAi',
+}
+
+# aria-colindex of each field's column in the people search table
+PEOPLE_FIELD_COLUMNS = {
+    'name': 1,
+    'job_title': 2,
+    'company_name': 3,
+    'email_button': 4,
+    'phone_button': 5,
+    'linkedin': 7,
+    'location': 9,
+    'employee_count': 10,
+    'industries': 11,
+    'keywords': 12,
+}
+
+# Header labels of each field's column in a saved list, lower-cased. Users can reorder and hide
+# list columns, so list columns are found by header text rather than by position.
+LIST_COLUMN_HEADERS = {
+    'name': ('name',),
+    'job_title': ('job title', 'title'),
+    'company_name': ('company', 'company name'),
+    'email_button': ('emails', 'email'),
+    'phone_button': ('phone numbers', 'phone number', 'phone'),
+    'linkedin': ('links', 'contact linkedin', 'linkedin'),
+    'location': ('location', 'contact location'),
+    'employee_count': ('company · number of employees', '# employees', 'employees', 'number of employees'),
+    'industries': ('company · industries', 'industry', 'industries'),
+    'keywords': ('company · keywords', 'keywords', 'company keywords'),
+}
+
+# Stands in for a column the table does not show, so that field simply comes out missing
+MISSING_COLUMN_SELECTOR = 'div[data-column-not-shown]'
+
+# Returns [header text, aria-colindex] for every column header of the page's table
+HEADER_CELLS_JS = '''
+return Array.from(document.querySelectorAll('[role="columnheader"][aria-colindex]'),
+                  cell => [cell.textContent.trim(), Number(cell.getAttribute('aria-colindex'))]);
+'''
+
+
+def column_field_selectors(field_columns):
+    '''Per-row field selectors for a table whose fields are in the given aria-colindex columns.'''
+    return {
+        field: f'div[aria-colindex="{field_columns[field]}"] {cell}' if field in field_columns else MISSING_COLUMN_SELECTOR
+        for field, cell in FIELD_CELL_SELECTORS.items()
+    }
+
+
+def list_field_columns(header_cells):
+    '''Find each field's aria-colindex from a saved list's header cells ([text, colindex] pairs, as
+    returned by HEADER_CELLS_JS). Fields without a matching header are left out.'''
+    columns_by_header = {}
+    for text, colindex in header_cells:
+        columns_by_header.setdefault(' '.join(text.split()).lower(), colindex)
+    columns = {}
+    for field, headers in LIST_COLUMN_HEADERS.items():
+        for header in headers:
+            if header in columns_by_header:
+                columns[field] = columns_by_header[header]
+                break
+    return columns
+
+
+# Per-row CSS selectors, relative to a single people row
+PEOPLE_FIELD_SELECTORS = column_field_selectors(PEOPLE_FIELD_COLUMNS)
+
+# Returns the outerHTML of the table body only, instead of serializing the whole page
+ROWGROUP_HTML_JS = '''
+const body = document.querySelector(arguments[0]);
+return body ? body.outerHTML : null;
+'''
+
+# Returns, per row, the text and href of every match of every field selector as plain JSON
+ROW_FIELDS_JS = '''
+const [bodySelector, rowSelector, fieldSelectors] = arguments;
+const body = document.querySelector(bodySelector);
+if (!body) return null;
+return Array.from(body.querySelectorAll(rowSelector), row => {
+    const fields = {};
+    for (const selector of fieldSelectors) {
+        fields[selector] = Array.from(row.querySelectorAll(selector), el => ({
+            text: el.textContent,
+            href: el.getAttribute('href'),
+        }));
+    }
+    return fields;
+});
+'''
+
+
+class RowParser:
+    '''Turn the HTML of a people table into PersonRecords.
+
+    Backends only provide the DOM primitives (_document, _first, _all, _text, _attr); the
+    record-building rules live here so every backend produces identical records.
+    '''
+    name = None
+
+    def __init__(self, table_body_selector, row_selector, field_selectors=None):
+        self.table_body_selector = table_body_selector
+        self.row_selector = row_selector
+        self.field_selectors = dict(field_selectors or PEOPLE_FIELD_SELECTORS)
+        self.errors = 0
+
+    def parse(self, html):
+        '''Return the records of every row, or None if the table body is not in the HTML.'''
+        table_body = self._first(self._document(html), self.table_body_selector)
+        if table_body is None:
+            return None
+        return [self.parse_row(row, idx) for idx, row in enumerate(self._all(table_body, self.row_selector))]
+
+    def get_text_or_default(self, element, default=''):
+        '''Extract stripped text from an element or return default if it is missing.'''
+        return self._text(element).strip() if element is not None else default
+
+    def parse_row(self, row, idx=0):
+        '''Build a PersonRecord from one row. Fields that are missing or fail to extract are None.'''
+        fields = self.field_selectors
+        record = {}
+        try:
+            # 1. Name (column 1)
+            full_name = self.get_text_or_default(self._first(row, fields['name']), 'N/A')
+            if '------' in full_name:
+                full_name = full_name.split('------')[0].strip()
+
+            parts = full_name.split(maxsplit=1)
+            record['first_name'] = parts[0] if parts and parts[0] != 'N/A' else None
+            record['last_name'] = parts[1] if len(parts) > 1 else None
+
+            # 2. Job Title (column 2)
+            record['job_title'] = self.get_text_or_default(self._first(row, fields['job_title']), None)
+
+            # 3. Company Name (column 3)
+            record['business_name'] = self.get_text_or_default(self._first(row, fields['company_name']), None)
+
+            # 4. Email (column 4)
+            email_button = self._first(row, fields['email_button'])
+            if email_button is not None and 'Access email' in self._text(email_button):
+                record['personal_email'] = Access.REQUIRES_ACCESS
+
+            # 5. Phone Number (column 5)
+            phone_button = self._first(row, fields['phone_button'])
+            if phone_button is not None and 'Access Mobile' in self._text(phone_button):
+                record['phone_number'] = Access.REQUIRES_ACCESS
+
+            # 6. LinkedIn (column 7)
+            linkedin_link = self._first(row, fields['linkedin'])
+            if linkedin_link is not None:
+                record['personal_linkedin'] = self._attr(linkedin_link, 'href', None)
+
+            # 7. Location (column 9)
+            record['country'] = self.get_text_or_default(self._first(row, fields['location']), None)
+
+            # 8. Employee Count (column 10)
+            record['employee_count'] = self.get_text_or_default(self._first(row, fields['employee_count']), None)
+
+            # 9. Industries and Keywords
+            niche_elements = self._all(row, fields['industries']) + self._all(row, fields['keywords'])
+            all_niches = [self.get_text_or_default(el) for el in niche_elements]
+            all_niches = [n for n in all_niches if not n.startswith('+') and n != 'N/A']
+            record['niche'] = ", ".join(all_niches) if all_niches else None
+
+        except Exception as e:
+            self.errors += 1
+            print(f"Error processing row {idx}: {e}")
+
+        return PersonRecord(*(record.get(field) for field in PersonRecord._fields))
+
+    def _document(self, html):
+        raise NotImplementedError
+
+    def _first(self, node, selector):
+        raise NotImplementedError
+
+    def _all(self, node, selector):
+        raise NotImplementedError
+
+    def _text(self, element):
+        raise NotImplementedError
+
+    def _attr(self, element, name, default=None):
+        raise NotImplementedError
+
+
+class BeautifulSoupParser(RowParser):
+    '''Reference backend: BeautifulSoup with the pure-Python html.parser and soupsieve selectors.'''
+    name = 'bs4'
+
+    def _document(self, html):
+        return BeautifulSoup(html, 'html.parser')
+
+    def _first(self, node, selector):
+        return node.select_one(selector)
+
+    def _all(self, node, selector):
+        return node.select(selector)
+
+    def _text(self, element):
+        return element.text
+
+    def _attr(self, element, name, default=None):
+        return element.get(name, default)
+
+
+class LxmlParser(RowParser):
+    '''Fast backend: libxml2 parsing with every CSS selector compiled to XPath once, up front.'''
+    name = 'lxml'
+
+    def __init__(self, table_body_selector, row_selector, field_selectors=None):
+        super().__init__(table_body_selector, row_selector, field_selectors)
+        import lxml.html
+        from lxml import etree
+        from cssselect import HTMLTranslator
+
+        self._lxml_html = lxml.html
+        translator = HTMLTranslator()
+        selectors = [table_body_selector, row_selector, *self.field_selectors.values()]
+        # 'descendant::' matches soupsieve, which never matches the node the query starts from
+        self._compiled = {
+            css: etree.XPath(translator.css_to_xpath(css, prefix='descendant::'))
+            for css in selectors
+        }
+
+    def _document(self, html):
+        return self._lxml_html.document_fromstring(html)
+
+    def _first(self, node, selector):
+        matches = self._compiled[selector](node)
+        return matches[0] if matches else None
+
+    def _all(self, node, selector):
+        return self._compiled[selector](node)
+
+    def _text(self, element):
+        return element.text_content()
+
+    def _attr(self, element, name, default=None):
+        return element.get(name, default)
+
+
+class ScriptResultParser(RowParser):
+    '''Backend for rows already extracted in the browser by ROW_FIELDS_JS.
+
+    Each row is a dict of selector -> list of {text, href} matches, so no HTML is parsed at all.
+    '''
+    name = 'script'
+
+    def script_args(self):
+        '''Arguments to pass to driver.execute_script(ROW_FIELDS_JS, ...).'''
+        return [self.table_body_selector, self.row_selector, list(self.field_selectors.values())]
+
+    def parse(self, raw_rows):
+        if raw_rows is None:
+            return None
+        return [self.parse_row(row, idx) for idx, row in enumerate(raw_rows)]
+
+    def _first(self, node, selector):
+        matches = node.get(selector) or []
+        return matches[0] if matches else None
+
+    def _all(self, node, selector):
+        return node.get(selector) or []
+
+    def _text(self, element):
+        return element.get('text') or ''
+
+    def _attr(self, element, name, default=None):
+        value = element.get(name)
+        return default if value is None else value
+
+
+def parse_snapshot(mode, payload, html_parser, script_parser):
+    '''Parse what ApolloScraper pulled out of the browser for one page.
+
+    mode is the extraction mode the payload came from. Returns (records, row_errors); records is
+    None if the page had no people table.
+    '''
+    if mode == 'api':
+        from api import records_from_search_response
+        return records_from_search_response(payload), 0
+    parser = script_parser if mode == 'script' else html_parser
+    errors_before = parser.errors
+    records = parser.parse(payload)
+    return records, parser.errors - errors_before
+
+
+PARSERS = {
+    BeautifulSoupParser.name: BeautifulSoupParser,
+    LxmlParser.name: LxmlParser,
+}
+
+
+def get_parser(name, table_body_selector, row_selector, field_selectors=None):
+    '''Create a parser backend by name, falling back to BeautifulSoup if lxml is not installed.'''
+    if name not in PARSERS:
+        raise ValueError(f"Unknown parser '{name}'. Choose one of: {', '.join(PARSERS)}")
+    try:
+        return PARSERS[name](table_body_selector, row_selector, field_selectors)
+    except ImportError as e:
+        print(f"Parser '{name}' unavailable ({e}), falling back to BeautifulSoup")
+        return BeautifulSoupParser(table_body_selector, row_selector, field_selectors)
@@ -0,0 +1,140 @@
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from parsers import ScriptResultParser, get_parser, parse_snapshot
+
+# Parsers of a pool worker process, built once by _init_parse_worker
+_worker_parsers = {}
+
+
+def _init_parse_worker(parser_name, table_body_selector, row_selector, field_selectors):
+    _worker_parsers['html'] = get_parser(parser_name, table_body_selector, row_selector, field_selectors)
+    _worker_parsers['script'] = ScriptResultParser(table_body_selector, row_selector, field_selectors)
+
+
+def _parse_in_worker(mode, payload):
+    return parse_snapshot(mode, payload, _worker_parsers['html'], _worker_parsers['script'])
+
+
+class ScrapePipeline:
+    '''Scrape people or list pages with browser work, parsing and persistence overlapping.
+
+    The calling thread owns the browser: it only pulls page snapshots out and paginates. Snapshots
+    are parsed in a process pool and a writer thread persists the results in page order. A bounded
+    queue between the two keeps the browser at most max_pending pages ahead of the writer.
+    '''
+
+    def __init__(self, scraper, sink, parse_workers=2, max_pending=4):
+        self.scraper = scraper
+        self.sink = sink
+        self.parse_workers = parse_workers
+        self.max_pending = max_pending
+        self._pending = None
+        self._stop = threading.Event()
+        self.pages_saved = 0
+        self.total_rows = 0
+
+    def run(self, num_pages_to_scrape, start_page=1):
+        '''Scrape like ApolloScraper.scrape_data(). Returns the number of pages saved.'''
+        scraper = self.scraper
+        start = scraper._start_scrape(num_pages_to_scrape, start_page)
+        if start is None:
+            return 0
+        job_key, pages_done, total_rows, first_page, num_pages_remaining = start
+        self.pages_saved = 0
+        self.total_rows = total_rows
+        self._stop.clear()
+        self._pending = queue.Queue(maxsize=self.max_pending)
+        finished = num_pages_remaining <= 0
+
+        writer = threading.Thread(target=self._write_pages, args=(job_key, pages_done), name='scrape-writer', daemon=True)
+        writer.start()
+        parser = scraper.parser
+        pool = ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            initializer=_init_parse_worker,
+            initargs=(parser.name, parser.table_body_selector, parser.row_selector, parser.field_selectors),
+        )
+        try:
+            page_num = 0
+            while page_num < num_pages_remaining and not self._stop.is_set():
+                page_num += 1
+                result_page = first_page + page_num - 1
+                print(f'Fetching page {page_num}/{num_pages_remaining} (result page {result_page})...')
+
+                with scraper.metrics.span('fetch', page=result_page):
+                    mode, payload, cursor, challenged = scraper._recovering(self._fetch, result_page)
+                future = pool.submit(_parse_in_worker, mode, payload)
+                # Blocks while the writer is max_pending pages behind
+                self._pending.put((result_page, mode, future, cursor, challenged))
+
+                if page_num < num_pages_remaining:
+                    outcome = scraper._move_to_next_page(result_page)
+                    if outcome != 'next':
+                        finished = outcome == 'end'
+                        break
+                else:
+                    print(f"Reached the maximum specified number of pages: {num_pages_to_scrape}")
+                    finished = True
+        finally:
+            self._pending.put(None)
+            writer.join()
+            pool.shutdown(cancel_futures=True)
+
+        # The writer stops early on a page without rows; the crawl is then not complete
+        if finished and not self._stop.is_set() and scraper.checkpoint is not None:
+            scraper.checkpoint.mark_complete(job_key, pages_done + self.pages_saved, self.total_rows)
+
+        scraper.metrics.print_summary()
+        return self.pages_saved
+
+    def _fetch(self):
+        mode, payload = self.scraper._fetch_page_snapshot()
+        cursor = self.scraper.waiter.page_marker()
+        # Read here, in the browser's thread and on this page; the writer only gets the answer
+        challenged = cursor is None and self.scraper._challenge_showing()
+        return mode, payload, cursor, challenged
+
+    def _write_pages(self, job_key, pages_done):
+        '''Writer thread: wait for each page's parse, then dedup, persist and checkpoint it in page order.'''
+        scraper = self.scraper
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            if self._stop.is_set():
+                # Drain what the browser already fetched so it never blocks on a full queue
+                continue
+
+            result_page, mode, future, cursor, challenged = item
+            try:
+                with scraper.metrics.span('parse', mode=mode):
+                    rows, row_errors = future.result()
+            except Exception as e:
+                print(f"Parsing result page {result_page} failed: {e}")
+                scraper.metrics.incr('page_failures', reason='parse_error')
+                self._stop.set()
+                continue
+
+            scraper._count_row_problems(rows, row_errors)
+            if not scraper._check_page_rows(rows, challenged):
+                self._stop.set()
+                continue
+
+            try:
+                batch = scraper._new_records(rows, result_page)
+                scraper._write_batch(batch, self.sink)
+            except Exception as e:
+                print(f"Saving result page {result_page} failed: {e}")
+                scraper.metrics.incr('page_failures', reason='save_error')
+                self._stop.set()
+                continue
+
+            self.pages_saved += 1
+            self.total_rows += len(rows)
+            scraper.metrics.incr('pages_scraped')
+            print(f"Saved {len(batch)} rows from result page {result_page}")
+            if scraper.checkpoint is not None:
+                scraper.checkpoint.record_page(job_key, scraper.filters, result_page, pages_done + self.pages_saved,
+                                               len(rows), self.total_rows, cursor)
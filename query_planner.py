@@ -0,0 +1,186 @@
+'''Split a search that is too big for Apollo's pagination cap into shards that each fit under it.
+
+    python query_planner.py --workers 4       # plan FILTERS from main.py, then scrape every shard
+    python query_planner.py --plan-only       # just print the shards and their result counts
+'''
+import argparse
+import math
+
+from filter_plan import compile_filter_url
+
+# Seniority values Apollo's search accepts (personSeniorities[]), most senior first
+SENIORITY_VALUES = ['owner', 'founder', 'c_suite', 'partner', 'vp', 'head', 'director', 'manager', 'senior', 'entry',
+                    'intern']
+
+# Apollo's company headcount buckets (organizationNumEmployeesRanges[]); None means no upper bound
+EMPLOYEE_RANGES = [(1, 10), (11, 20), (21, 50), (51, 100), (101, 200), (201, 500), (501, 1000), (1001, 2000),
+                   (2001, 5000), (5001, 10000), (10001, None)]
+
+# Locations that can be narrowed into smaller ones. People whose profile only names the country
+# match the country but none of its states, so splitting a location can lose a few results.
+LOCATION_PARTS = {
+    'United States': [
+        'Alabama, US', 'Alaska, US', 'Arizona, US', 'Arkansas, US', 'California, US', 'Colorado, US',
+        'Connecticut, US', 'Delaware, US', 'District of Columbia, US', 'Florida, US', 'Georgia, US', 'Hawaii, US',
+        'Idaho, US', 'Illinois, US', 'Indiana, US', 'Iowa, US', 'Kansas, US', 'Kentucky, US', 'Louisiana, US',
+        'Maine, US', 'Maryland, US', 'Massachusetts, US', 'Michigan, US', 'Minnesota, US', 'Mississippi, US',
+        'Missouri, US', 'Montana, US', 'Nebraska, US', 'Nevada, US', 'New Hampshire, US', 'New Jersey, US',
+        'New Mexico, US', 'New York, US', 'North Carolina, US', 'North Dakota, US', 'Ohio, US', 'Oklahoma, US',
+        'Oregon, US', 'Pennsylvania, US', 'Rhode Island, US', 'South Carolina, US', 'South Dakota, US',
+        'Tennessee, US', 'Texas, US', 'Utah, US', 'Vermont, US', 'Virginia, US', 'Washington, US',
+        'West Virginia, US', 'Wisconsin, US', 'Wyoming, US',
+    ],
+}
+
+
+def _bisect(filters, key, values):
+    '''Two filter sets that split values between them, or None if there is only one value left.'''
+    if len(values) < 2:
+        return None
+    middle = len(values) // 2
+    return [dict(filters, **{key: values[:middle]}), dict(filters, **{key: values[middle:]})]
+
+
+def split_seniorities(filters):
+    values = filters.get('seniorities') or SENIORITY_VALUES
+    return _bisect(filters, 'seniorities', values if isinstance(values, list) else [values])
+
+
+def split_employee_ranges(filters):
+    values = filters.get('employee_ranges') or EMPLOYEE_RANGES
+    return _bisect(filters, 'employee_ranges', list(values))
+
+
+def split_location(filters):
+    values = filters.get('location')
+    if not values:
+        return None
+    if isinstance(values, str):
+        values = [values]
+    if len(values) == 1:
+        parts = LOCATION_PARTS.get(values[0])
+        return [dict(filters, location=part) for part in parts] if parts else None
+    return _bisect(filters, 'location', values)
+
+
+# Tried in order: the first dimension that can still be narrowed splits a shard that is too big
+SPLIT_DIMENSIONS = [('seniorities', split_seniorities), ('employee_ranges', split_employee_ranges),
+                    ('location', split_location)]
+
+
+def result_pages(result_count, page_size, max_pages):
+    '''Pages needed to read result_count results, capped at max_pages.'''
+    return max(1, min(max_pages, math.ceil(result_count / page_size)))
+
+
+class QueryPlanner:
+    '''Find a set of filter shards whose results together cover a search that Apollo would cut off.
+
+    Apollo stops paginating after max_pages pages, so a search with more than max_pages * page_size
+    results is split along SPLIT_DIMENSIONS, recursively, until every shard fits. Result counts are
+    read by loading each candidate filter set as URL state in the scraper's logged-in browser.
+
+    Splitting on a dimension the search did not filter on yet (e.g. seniority) leaves out people
+    without a value for it; plan() prints how much of the search the shards cover.
+    '''
+
+    def __init__(self, scraper, max_pages, page_size, split_dimensions=SPLIT_DIMENSIONS):
+        self.scraper = scraper
+        self.max_pages = max_pages
+        self.page_size = page_size
+        self.split_dimensions = split_dimensions
+        self.max_results = max_pages * page_size
+        self.counts_read = 0
+
+    def count(self, filters):
+        self.counts_read += 1
+        result_count = self.scraper.count_results(filters)
+        if result_count is None:
+            raise RuntimeError(f"Could not read the result count for {filters}")
+        filter_plans = self.scraper.filter_plans
+        if filter_plans is not None:
+            # Shards then load straight from URL state; the count was read from the URL alone, so nothing was checked
+            base_url = self.scraper.base_url
+            filter_plans.record(base_url, filters, compile_filter_url(base_url, filters), result_count, unchecked=filters)
+        return result_count
+
+    def plan(self, filters):
+        '''Return shards ({'shard_id', 'filters', 'start_page', 'num_pages', 'result_count'}), largest first.'''
+        total = self.count(filters)
+        print(f"Search has {total} results; one search can page through {self.max_results}")
+        leaves = self._split(filters, total, 0)
+        leaves.sort(key=lambda leaf: leaf[1], reverse=True)
+
+        shards = []
+        for shard_id, (shard_filters, result_count) in enumerate(leaves):
+            shards.append({
+                'shard_id': shard_id,
+                'filters': shard_filters,
+                'start_page': 1,
+                'num_pages': result_pages(result_count, self.page_size, self.max_pages),
+                'result_count': result_count,
+            })
+        covered = sum(shard['result_count'] for shard in shards)
+        reachable = sum(min(shard['result_count'], self.max_results) for shard in shards)
+        print(f"Planned {len(shards)} shards from {self.counts_read} result counts: {covered} results "
+              f"({covered / total if total else 1:.0%} of the search), {reachable} within reach")
+        return shards
+
+    def _split(self, filters, result_count, depth):
+        if result_count <= self.max_results:
+            return [(filters, result_count)] if result_count else []
+
+        for dimension, split in self.split_dimensions:
+            parts = split(filters)
+            if not parts:
+                continue
+            counts = [self.count(part) for part in parts]
+            # A filter Apollo ignored gives every part the whole result set; try the next dimension
+            if all(part_count == result_count for part_count in counts):
+                print(f"Splitting on {dimension} did not narrow the search; skipping it")
+                continue
+            print(f"{'  ' * depth}{result_count} results split on {dimension}: {counts}")
+            leaves = []
+            for part, part_count in zip(parts, counts):
+                leaves.extend(self._split(part, part_count, depth + 1))
+            return leaves
+
+        print(f"Cannot split {filters} further; only {self.max_results} of its {result_count} results are reachable")
+        return [(filters, result_count)]
+
+
+if __name__ == "__main__":
+    from browser_pool import BrowserPool
+    from coordinator import CrawlCoordinator
+    from filter_plan import FilterPlanCache
+    from main import APOLLO_MAX_PAGES, BASE_URL, FILTERS, PEOPLE_PAGE_SIZE, ApolloScraper
+    from sinks import open_sink
+
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--workers', type=int, default=4)
+    arg_parser.add_argument('--sink', default='data.db')
+    arg_parser.add_argument('--plan-only', action='store_true')
+    args = arg_parser.parse_args()
+
+    user_agents = ["Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/94.0.4606.71 Safari/537.36"]
+    filter_plans = FilterPlanCache('filter_plans.json')
+    browser_pool = BrowserPool(lambda: ApolloScraper(user_agents, BASE_URL, FILTERS, filter_plans=filter_plans))
+    try:
+        scraper = browser_pool.acquire()
+        # Split searches are loaded as URL state only, so the URL form of FILTERS must have checked out at login
+        if filter_plans.get(BASE_URL, FILTERS) is None:
+            raise SystemExit("The filter URL did not match the UI filters; cannot plan shards without it")
+        shards = QueryPlanner(scraper, APOLLO_MAX_PAGES, PEOPLE_PAGE_SIZE).plan(FILTERS)
+    finally:
+        browser_pool.close()
+
+    for shard in shards:
+        print(f"Shard {shard['shard_id']}: {shard['result_count']} results, {shard['num_pages']} pages, {shard['filters']}")
+    if not args.plan_only:
+        # Shards share one dedup index, so people matching several shards are written once
+        coordinator = CrawlCoordinator(user_agents, BASE_URL, sink_path=args.sink, dedup_path='seen_people.db',
+                                       max_workers=args.workers, checkpoint_path='crawl_checkpoint.jsonl',
+                                       filter_plans_path='filter_plans.json', rate_governor_path='rate_governor.db')
+        coordinator.run(shards)
+        with open_sink(args.sink) as sink:
+            sink.export_excel('data.xlsx')
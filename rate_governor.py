@@ -0,0 +1,109 @@
+import random
+import sqlite3
+import threading
+import time
+
+
+class RateGovernor:
+    '''Token bucket that paces page loads for every browser of one Apollo account.
+
+    The bucket lives in a SQLite file, so scrapers in other threads or processes (see coordinator.py)
+    draw from the same budget. One token is added every `interval` seconds, up to `burst` tokens.
+    The interval adapts: it shrinks by `speedup` seconds after each page that loaded in under
+    `fast_latency` seconds, and is multiplied by `backoff` on a Cloudflare challenge, an empty
+    table or a timeout, so the account settles just below the rate Apollo starts pushing back at.
+    '''
+
+    def __init__(self, path, account, start_interval=3.0, min_interval=1.0, max_interval=120.0, burst=1,
+                 fast_latency=2.0, speedup=0.1, backoff=2.0, jitter=0.3):
+        self.path = path
+        self.account = account or 'default'
+        self.start_interval = start_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.burst = burst
+        self.fast_latency = fast_latency
+        self.speedup = speedup
+        self.backoff = backoff
+        # Waits are stretched by up to this fraction, so page loads do not tick like a metronome
+        self.jitter = jitter
+        # Autocommit mode; every read-modify-write below takes the write lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'account TEXT PRIMARY KEY, tokens REAL, updated REAL, interval REAL, strikes INTEGER)'
+        )
+        # Scrapers in other threads of this process share the connection (see daemon.py)
+        self._lock = threading.Lock()
+
+    def _update(self, change):
+        '''Refill the account's bucket, apply change(state) to it and save it, all in one transaction.'''
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT tokens, updated, interval, strikes FROM buckets WHERE account = ?', (self.account,)
+                ).fetchone()
+                now = time.time()
+                if row is None:
+                    state = {'tokens': self.burst, 'interval': self.start_interval, 'strikes': 0}
+                else:
+                    tokens, updated, interval, strikes = row
+                    state = {'tokens': min(self.burst, tokens + max(0.0, now - updated) / interval),
+                             'interval': interval, 'strikes': strikes}
+                result = change(state)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO buckets (account, tokens, updated, interval, strikes) VALUES (?, ?, ?, ?, ?)',
+                    (self.account, state['tokens'], now, state['interval'], state['strikes']),
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return result
+
+    def acquire(self):
+        '''Block until the account may load another page. Returns the seconds waited.'''
+        started = time.perf_counter()
+        while True:
+            def take(state):
+                if state['tokens'] >= 1:
+                    state['tokens'] -= 1
+                    return 0.0
+                return (1 - state['tokens']) * state['interval']
+
+            wait = self._update(take)
+            if not wait:
+                return time.perf_counter() - started
+            time.sleep(wait * random.uniform(1, 1 + self.jitter))
+
+    def report_success(self, latency):
+        '''A page loaded in latency seconds; speed up if that was fast.'''
+        def change(state):
+            state['strikes'] = 0
+            if latency < self.fast_latency:
+                state['interval'] = max(self.min_interval, state['interval'] - self.speedup)
+            return state['interval']
+        return self._update(change)
+
+    def report_trouble(self, reason):
+        '''Apollo pushed back ('challenge', 'empty_table' or 'timeout'): slow down and drain the bucket.
+
+        Returns the new interval between page loads.
+        '''
+        def change(state):
+            state['strikes'] += 1
+            state['interval'] = min(self.max_interval, state['interval'] * self.backoff)
+            state['tokens'] = 0.0
+            return state['interval']
+        interval = self._update(change)
+        print(f"Backing off after {reason}: one page every {interval:.1f}s for account {self.account}")
+        return interval
+
+    def state(self):
+        '''Current interval, tokens and consecutive trouble reports of the account's bucket.'''
+        return self._update(lambda state: dict(state))
+
+    def close(self):
+        self._conn.close()
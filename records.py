@@ -0,0 +1,137 @@
+from collections import namedtuple
+from enum import Enum
+
+# Column order of every record, as shown in exports
+PEOPLE_COLUMNS = [
+    'First Name',
+    'Last Name',
+    'Job Title',
+    'Business Name',
+    'Personal email',
+    'Phone number',
+    'Personal LinkedIn',
+    'Company LinkedIn',
+    'Country',
+    'Niche',
+    'Employee Count',
+]
+
+# Field order matches PEOPLE_COLUMNS, so a record can be zipped straight onto the display columns
+PersonRecord = namedtuple('PersonRecord', [
+    'first_name',
+    'last_name',
+    'job_title',
+    'business_name',
+    'personal_email',
+    'phone_number',
+    'personal_linkedin',
+    'company_linkedin',
+    'country',
+    'niche',
+    'employee_count',
+])
+PersonRecord.__doc__ = '''One scraped person. Missing values are None; locked contact details are Access.REQUIRES_ACCESS.'''
+
+FIELD_COLUMNS = dict(zip(PersonRecord._fields, PEOPLE_COLUMNS))
+
+# Low-cardinality fields that are stored once per distinct value
+DICTIONARY_FIELDS = ('country', 'niche', 'employee_count', 'personal_email', 'phone_number')
+
+
+class Access(str, Enum):
+    '''Contact details Apollo shows only after spending credits.'''
+    REQUIRES_ACCESS = 'Requires Access'
+
+
+MISSING = 'N/A'
+
+
+def from_value(value):
+    '''Map a display value to its typed form: 'N/A' becomes None and 'Requires Access' becomes Access.REQUIRES_ACCESS.'''
+    if value is None or value == MISSING:
+        return None
+    if value == Access.REQUIRES_ACCESS.value:
+        return Access.REQUIRES_ACCESS
+    return value
+
+
+def to_value(value, na=MISSING):
+    '''Map a typed value back to its display form.'''
+    if value is None:
+        return na
+    if isinstance(value, Access):
+        return value.value
+    return value
+
+
+def record_from_row(row):
+    '''Build a PersonRecord from a row keyed by display column (as read back from a sink).'''
+    return PersonRecord(*(from_value(row.get(column)) for column in PEOPLE_COLUMNS))
+
+
+def record_to_row(record, na=MISSING):
+    '''Render a PersonRecord as a row keyed by display column, with na standing in for missing values.'''
+    return {column: to_value(value, na) for column, value in zip(PEOPLE_COLUMNS, record)}
+
+
+class RecordBatch:
+    '''Column-oriented batch of PersonRecords (usually one page, whose number is kept in page).
+
+    Values of DICTIONARY_FIELDS are interned, so a million rows share one string per distinct
+    country or niche. Converts to Arrow with dictionary-encoded columns or to pandas categoricals.
+    '''
+
+    def __init__(self, records=(), page=None):
+        self.page = page
+        self.columns = {field: [] for field in PersonRecord._fields}
+        self._dictionaries = {field: {} for field in DICTIONARY_FIELDS}
+        self.extend(records)
+
+    def __len__(self):
+        return len(self.columns['first_name'])
+
+    def __iter__(self):
+        return (PersonRecord(*values) for values in zip(*self.columns.values()))
+
+    def append(self, record):
+        for field, value in zip(PersonRecord._fields, record):
+            if value is not None and field in self._dictionaries:
+                value = self._dictionaries[field].setdefault(value, value)
+            self.columns[field].append(value)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def to_rows(self, na=MISSING):
+        '''Rows keyed by display column, for row-oriented sinks such as CSV and SQLite.'''
+        return [record_to_row(record, na) for record in self]
+
+    def to_arrow(self):
+        '''Arrow table with display column names; dictionary fields are dictionary-encoded and missing values are null.'''
+        import pyarrow as pa
+
+        arrays = []
+        for field, values in self.columns.items():
+            array = pa.array([to_value(v, None) for v in values], type=pa.string())
+            if field in DICTIONARY_FIELDS:
+                array = array.dictionary_encode()
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, names=PEOPLE_COLUMNS)
+
+    def to_pandas(self):
+        '''DataFrame with nullable string columns and categoricals for the dictionary fields.'''
+        import pandas as pd
+
+        data = {}
+        for field, values in self.columns.items():
+            column = pd.Series([to_value(v, None) for v in values], dtype='string')
+            data[FIELD_COLUMNS[field]] = column.astype('category') if field in DICTIONARY_FIELDS else column
+        return pd.DataFrame(data)
+
+
+def as_batch(records):
+    '''Wrap PersonRecords (or display-keyed rows) in a RecordBatch, passing an existing batch through.'''
+    if isinstance(records, RecordBatch):
+        return records
+    return RecordBatch(record_from_row(record) if isinstance(record, dict) else record for record in records)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import time
+
+DUMP_LOCAL_STORAGE_JS = 'return Object.assign({}, window.localStorage);'
+
+RESTORE_LOCAL_STORAGE_JS = '''
+for (const [key, value] of Object.entries(arguments[0])) {
+    window.localStorage.setItem(key, value);
+}
+'''
+
+
+class SessionCache:
+    '''Persist an account's cookies and localStorage so later runs can skip the login form.
+
+    Files are keyed by a hash of the account email and are only readable by the current user,
+    since they grant access to the account.
+    '''
+
+    def __init__(self, cache_dir='sessions', max_age=7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_age = max_age
+
+    def _path(self, account):
+        digest = hashlib.sha1(account.strip().lower().encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def save(self, driver, account):
+        '''Snapshot the browser's cookies and localStorage for account.'''
+        os.makedirs(self.cache_dir, exist_ok=True)
+        session = {
+            'saved_at': time.time(),
+            'cookies': driver.get_cookies(),
+            'local_storage': driver.execute_script(DUMP_LOCAL_STORAGE_JS) or {},
+        }
+        path = self._path(account)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(session, f)
+        os.chmod(path, 0o600)
+        print(f"Saved session for reuse ({len(session['cookies'])} cookies)")
+
+    def load(self, account):
+        '''Return the cached session for account, or None if there is none or it is too old.'''
+        path = self._path(account)
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            session = json.load(f)
+        if time.time() - session.get('saved_at', 0) > self.max_age:
+            print("Cached session is too old, ignoring it")
+            return None
+        return session
+
+    def restore(self, driver, account, origin_url):
+        '''Load the cached cookies and localStorage into the browser. Returns False if there was nothing to restore.'''
+        session = self.load(account)
+        if not session:
+            return False
+
+        # Cookies can only be set for the domain the browser is currently on
+        driver.get(origin_url)
+        restored = 0
+        for cookie in session['cookies']:
+            cookie = dict(cookie)
+            if 'expiry' in cookie:
+                cookie['expiry'] = int(cookie['expiry'])
+            if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+                cookie.pop('sameSite', None)
+            try:
+                driver.add_cookie(cookie)
+                restored += 1
+            except Exception:
+                continue
+        driver.execute_script(RESTORE_LOCAL_STORAGE_JS, session.get('local_storage', {}))
+        print(f"Restored cached session ({restored} cookies)")
+        return restored > 0
+
+    def invalidate(self, account):
+        '''Forget the cached session for account, e.g. once Apollo has expired it.'''
+        path = self._path(account)
+        if os.path.isfile(path):
+            os.remove(path)
@@ -0,0 +1,270 @@
+import csv
+import json
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from records import MISSING, PEOPLE_COLUMNS, as_batch, record_from_row
+
+
+class OutputSink:
+    '''Append-only destination for scraped rows. Writing a page costs time proportional to that page only.'''
+
+    def __init__(self, path):
+        self.path = path
+        self.rows_written = 0
+
+    def write(self, records):
+        '''Append a page of records (a RecordBatch, or a list of PersonRecords). Returns the number written.'''
+        raise NotImplementedError
+
+    def iter_rows(self):
+        '''Yield every stored row as a dict keyed by display column, in the order it was written.'''
+        raise NotImplementedError
+
+    def iter_records(self):
+        '''Yield every stored row as a PersonRecord.'''
+        for row in self.iter_rows():
+            yield record_from_row(row)
+
+    def exists(self):
+        '''Return True if the sink holds data on disk.'''
+        return os.path.exists(self.path)
+
+    def read_dataframe(self):
+        '''Load the whole sink into a DataFrame. Only meant for one-off exports.'''
+        return pd.DataFrame(list(self.iter_rows()))
+
+    def export_excel(self, excel_file_path, rows=None):
+        '''Write the sink (or the given rows) to an Excel file in a single pass.'''
+        df = pd.DataFrame(list(rows if rows is not None else self.iter_rows()))
+        df.to_excel(excel_file_path, index=False, na_rep=MISSING)
+        print(f"Exported {len(df)} rows to {excel_file_path}")
+        return len(df)
+
+    def close(self):
+        '''Release any open file handles.'''
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class CsvSink(OutputSink):
+    '''Append rows to a CSV file, writing the header only when the file is new. Missing values are written as N/A.'''
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = None
+        self._writer = None
+        self.columns = self._read_header()
+
+    def _read_header(self):
+        if not os.path.isfile(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return next(csv.reader(f), None)
+
+    def _open(self):
+        new_file = self.columns is None
+        if new_file:
+            self.columns = list(PEOPLE_COLUMNS)
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction='ignore')
+        if new_file:
+            self._writer.writeheader()
+
+    def write(self, records):
+        batch = as_batch(records)
+        if not batch:
+            return 0
+        if self._writer is None:
+            self._open()
+        self._writer.writerows(batch.to_rows(na=MISSING))
+        self._file.flush()
+        self.rows_written += len(batch)
+        return len(batch)
+
+    def iter_rows(self):
+        if self._file:
+            self._file.flush()
+        if not self.exists():
+            return
+        with open(self.path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+
+class JsonlSink(OutputSink):
+    '''Append rows to a JSON Lines file, one object per row. Missing values are written as null.'''
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = None
+
+    def write(self, records):
+        batch = as_batch(records)
+        if not batch:
+            return 0
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in batch.to_rows(na=None)))
+        self._file.flush()
+        self.rows_written += len(batch)
+        return len(batch)
+
+    def iter_rows(self):
+        if self._file:
+            self._file.flush()
+        if not self.exists():
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class ParquetSink(OutputSink):
+    '''Write each page as a Parquet row group. The path is a directory holding one part file per session.
+
+    Low-cardinality columns are dictionary-encoded and missing values are null.
+    '''
+
+    def __init__(self, path):
+        super().__init__(path)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("ParquetSink requires pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._pq = pq
+        self._writer = None
+        os.makedirs(self.path, exist_ok=True)
+
+    def exists(self):
+        return os.path.isdir(self.path) and any(name.endswith('.parquet') for name in os.listdir(self.path))
+
+    def _part_files(self):
+        return sorted(os.path.join(self.path, name) for name in os.listdir(self.path) if name.endswith('.parquet'))
+
+    def write(self, records):
+        batch = as_batch(records)
+        if not batch:
+            return 0
+        table = batch.to_arrow()
+        if self._writer is None:
+            part = os.path.join(self.path, f"part-{time.time_ns()}.parquet")
+            self._writer = self._pq.ParquetWriter(part, table.schema)
+        self._writer.write_table(table.cast(self._writer.schema))
+        self.rows_written += len(batch)
+        return len(batch)
+
+    def iter_rows(self):
+        # A part file is only readable once its footer is written; the next write starts a new part.
+        self.close()
+        if not os.path.isdir(self.path):
+            return
+        for part in self._part_files():
+            parquet_file = self._pq.ParquetFile(part)
+            for group in range(parquet_file.num_row_groups):
+                yield from parquet_file.read_row_group(group).to_pylist()
+
+    def read_dataframe(self):
+        self.close()
+        if not self.exists():
+            return pd.DataFrame(columns=PEOPLE_COLUMNS)
+        return pd.concat([self._pq.read_table(part).to_pandas() for part in self._part_files()], ignore_index=True)
+
+    def close(self):
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+
+class SqliteSink(OutputSink):
+    '''Append rows to a table in a SQLite database, one transaction per page. Missing values are stored as NULL.'''
+
+    def __init__(self, path, table='records'):
+        super().__init__(path)
+        self.table = table
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self.columns = self._read_columns()
+
+    def _read_columns(self):
+        info = self._conn.execute(f'PRAGMA table_info("{self.table}")').fetchall()
+        return [col[1] for col in info] or None
+
+    def _create_table(self):
+        self.columns = list(PEOPLE_COLUMNS)
+        column_defs = ', '.join(f'"{col}" TEXT' for col in self.columns)
+        self._conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.table}" ({column_defs})')
+
+    def exists(self):
+        return self.columns is not None
+
+    def write(self, records):
+        batch = as_batch(records)
+        if not batch:
+            return 0
+        if self.columns is None:
+            self._create_table()
+        placeholders = ', '.join('?' for _ in self.columns)
+        quoted = ', '.join(f'"{col}"' for col in self.columns)
+        with self._conn:
+            self._conn.executemany(
+                f'INSERT INTO "{self.table}" ({quoted}) VALUES ({placeholders})',
+                [tuple(row.get(col) for col in self.columns) for row in batch.to_rows(na=None)],
+            )
+        self.rows_written += len(batch)
+        return len(batch)
+
+    def iter_rows(self):
+        if self.columns is None:
+            return
+        cursor = self._conn.execute(f'SELECT * FROM "{self.table}" ORDER BY rowid')
+        names = [d[0] for d in cursor.description]
+        for values in cursor:
+            yield dict(zip(names, values))
+
+    def close(self):
+        if self._conn:
+            self._conn.close()
+            self._conn = None
+
+
+SINKS_BY_EXTENSION = {
+    '.csv': CsvSink,
+    '.jsonl': JsonlSink,
+    '.ndjson': JsonlSink,
+    '.parquet': ParquetSink,
+    '.db': SqliteSink,
+    '.sqlite': SqliteSink,
+    '.sqlite3': SqliteSink,
+}
+
+
+def open_sink(path):
+    '''Pick a sink implementation from the file extension of path.'''
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.xlsx', '.xls'):
+        raise ValueError("Excel is an export format, not a streaming sink. Use a .csv/.jsonl/.parquet/.db sink and export_excel().")
+    if ext not in SINKS_BY_EXTENSION:
+        raise ValueError(f"Unsupported sink type '{ext}'. Choose one of: {', '.join(SINKS_BY_EXTENSION)}")
+    return SINKS_BY_EXTENSION[ext](path)
@@ -0,0 +1,112 @@
+import random
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Identifies the rows currently rendered: row count, first aria-rowindex and the first contact link.
+# Apollo reuses aria-rowindex values on every page, so the contact link is what tells pages apart.
+PAGE_MARKER_JS = '''
+const body = document.querySelector(arguments[0]);
+if (!body) return null;
+const rows = body.querySelectorAll(arguments[1]);
+if (!rows.length) return null;
+const first = rows[0];
+const link = first.querySelector('a[href]');
+return [rows.length, first.getAttribute('aria-rowindex'), link ? link.getAttribute('href') : first.textContent.slice(0, 200)].join('|');
+'''
+
+
+class PageWaiter:
+    '''Event-driven waits that return as soon as the page is ready.
+
+    Politeness pauses are kept separate from readiness waits, and every wait is timed so
+    throughput can be tuned from real numbers instead of guesses.
+    '''
+
+    def __init__(self, driver, table_body_selector, row_selector, timeout=20, poll_frequency=0.1, politeness=(1.0, 3.0),
+                 metrics=None):
+        self.driver = driver
+        self.table_body_selector = table_body_selector
+        self.row_selector = row_selector
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.politeness = politeness
+        self.metrics = metrics
+        self.timings = []
+
+    def _record(self, label, started, ok):
+        seconds = time.perf_counter() - started
+        self.timings.append((label, seconds, ok))
+        if self.metrics is not None:
+            self.metrics.observe(f'wait_{label}', seconds, ok)
+
+    def wait_for(self, label, condition, timeout=None):
+        '''Wait until condition(driver) is truthy and return its value. Raises TimeoutException.'''
+        started = time.perf_counter()
+        try:
+            result = WebDriverWait(self.driver, timeout or self.timeout, poll_frequency=self.poll_frequency).until(condition)
+        except TimeoutException:
+            self._record(label, started, False)
+            raise
+        self._record(label, started, True)
+        return result
+
+    def try_wait_for(self, label, condition, timeout=None):
+        '''Like wait_for, but returns None instead of raising on timeout.'''
+        try:
+            return self.wait_for(label, condition, timeout)
+        except TimeoutException:
+            return None
+
+    def page_marker(self):
+        '''Return a string identifying the rows currently rendered, or None if there are none.'''
+        try:
+            return self.driver.execute_script(PAGE_MARKER_JS, self.table_body_selector, self.row_selector)
+        except WebDriverException:
+            return None
+
+    def wait_for_new_rows(self, previous_marker, label='page_change', timeout=None):
+        '''Wait until the table has re-rendered with rows different from previous_marker.'''
+        def rows_changed(driver):
+            marker = self.page_marker()
+            return marker if marker and marker != previous_marker else False
+        return self.wait_for(label, rows_changed, timeout)
+
+    def try_wait_for_new_rows(self, previous_marker, label='page_change', timeout=None):
+        '''Like wait_for_new_rows, but returns None instead of raising on timeout.'''
+        try:
+            return self.wait_for_new_rows(previous_marker, label, timeout)
+        except TimeoutException:
+            return None
+
+    def wait_for_document_ready(self, label='document_ready', timeout=None):
+        '''Wait until the browser reports the document as fully loaded.'''
+        return self.wait_for(label, lambda driver: driver.execute_script('return document.readyState') == 'complete', timeout)
+
+    def polite_pause(self):
+        '''Sleep for the configured politeness delay. This is the only deliberate idle time.'''
+        if not self.politeness:
+            return
+        started = time.perf_counter()
+        time.sleep(random.uniform(*self.politeness))
+        self._record('politeness', started, True)
+
+    def summary(self):
+        '''Aggregate timings per label: count, total, mean and max seconds, and timeouts.'''
+        stats = {}
+        for label, seconds, ok in self.timings:
+            entry = stats.setdefault(label, {'count': 0, 'total': 0.0, 'max': 0.0, 'timeouts': 0})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['timeouts'] += 0 if ok else 1
+        for entry in stats.values():
+            entry['mean'] = entry['total'] / entry['count']
+        return stats
+
+    def print_summary(self):
+        print("Wait timings (seconds):")
+        for label, entry in self.summary().items():
+            print(f"  {label}: n={entry['count']} mean={entry['mean']:.2f} max={entry['max']:.2f} "
+                  f"total={entry['total']:.2f} timeouts={entry['timeouts']}")